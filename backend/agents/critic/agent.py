@@ -11,10 +11,9 @@ Architecture:
 import json
 from typing import Dict, Any, Literal
 from langgraph.graph import StateGraph, END
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import SystemMessage, HumanMessage
 
-from backend.settings import settings
+from backend.llm import get_gemini
 from backend.events import get_emitter
 
 from backend.agents.critic.schemas import (
@@ -53,10 +52,9 @@ class CriticAgent:
             temperature: Lower temperature for consistent evaluation
         """
         # Base LLM for all critics
-        self.base_llm = ChatGoogleGenerativeAI(
-            model=model,
-            temperature=temperature,
-            google_api_key=settings.GEMINI_API_KEY,
+        self.base_llm = get_gemini(
+            model,
+            temperature,
             thinking_budget=-1,
             include_thoughts=True,
         )
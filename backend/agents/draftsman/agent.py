@@ -22,11 +22,10 @@ Design Principles:
 import json
 from typing import Optional, Dict, Any, Literal
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage, SystemMessage
 from langgraph.graph import StateGraph, END
 
-from backend.settings import settings
+from backend.llm import get_gemini
 from backend.events import get_emitter
 
 from backend.agents.draftsman.schemas import (
@@ -67,10 +66,9 @@ class DraftsmanAgent:
             temperature: Temperature for generation (lower = more deterministic)
         """
         # All agents use the same base model with structured output
-        self.base_llm = ChatGoogleGenerativeAI(
-            model=model,
-            temperature=temperature,
-            google_api_key=settings.GEMINI_API_KEY,
+        self.base_llm = get_gemini(
+            model,
+            temperature,
             thinking_budget=-1,
             include_thoughts=True,
         )
@@ -82,10 +80,9 @@ class DraftsmanAgent:
         self.section_draft_llm = self.base_llm.with_structured_output(SectionDraft)
         
         # Presentation Synthesizer uses raw text output (not structured)
-        self.presentation_synthesizer_llm = ChatGoogleGenerativeAI(
-            model=model,
-            temperature=0.2,  # Lower temperature for faithful formatting
-            google_api_key=settings.GEMINI_API_KEY,
+        self.presentation_synthesizer_llm = get_gemini(
+            model,
+            0.2,  # Lower temperature for faithful formatting
         )
         
         # Build the subgraph
@@ -841,7 +838,8 @@ class DraftsmanAgent:
             "current_draft": draft_markdown,  # For reflection loop
             "protocol_contract": protocol_contract,
             "draft_versions": [initial_version],
-            "reflection_iteration": 1  # Initialize reflection counter
+            "reflection_iteration": 1,  # Initialize reflection counter
+            "prev_action_items_hash": None  # Dedup applies within one reflection loop only
         }
 
 
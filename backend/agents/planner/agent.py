@@ -3,14 +3,17 @@ Production-Grade Planner Agent - LangGraph Subgraph Implementation
 """
 
 import json
+import logging
 from typing import Optional, List, Dict, Any
 
-from langchain_google_genai import ChatGoogleGenerativeAI
+import orjson
+
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 from langgraph.prebuilt import ToolNode
 
-from backend.settings import settings
+from backend.llm import get_gemini
 from backend.tools.clinical import ClinicalSearchTool, SafetyAdversaryTool
 from backend.events import get_emitter
 
@@ -18,10 +21,20 @@ from backend.agents.planner.schemas import PlanOutput
 from backend.agents.planner.state import PlannerState
 from backend.agents.planner.prompts import (
     REASONING_SYSTEM_PROMPT, DRAFTING_SYSTEM_PROMPT, 
-    REVISION_REASONING_PROMPT, REVISION_DRAFTING_PROMPT
+    REVISION_REASONING_PROMPT, REVISION_DRAFTING_PROMPT,
+    REVISION_PROMPT_TMPL, REVISION_DRAFTING_TMPL
 )
 
 
+logger = logging.getLogger(__name__)
+
+
+# --- Configuration ---
+REASONING_WINDOW_ROUNDS = 2         # Latest reasoning/tool rounds resent verbatim each iteration
+CONDENSED_REASONING_CHARS = 600     # Per-message cap when condensing older rounds
+CONDENSED_TOOL_OUTPUT_CHARS = 1500  # Per-result cap when condensing older rounds
+
+
 class PlannerAgent:
     """
     Production-grade Planner Agent implemented as a LangGraph Subgraph.
@@ -42,22 +55,20 @@ class PlannerAgent:
         """
         # Initialize Tools
         self.tools = [ClinicalSearchTool(), SafetyAdversaryTool()]
-        self.tools_by_name = {tool.name: tool for tool in self.tools}
+        self.tool_node = ToolNode(self.tools, handle_tool_errors=True)
         
         # Reasoning LLM (with tools bound)
-        self.reasoning_llm = ChatGoogleGenerativeAI(
-            model=reasoning_model,
-            temperature=0.75,  # Temperature ~0.4 for balanced reasoning
-            google_api_key=settings.GEMINI_API_KEY,
+        self.reasoning_llm = get_gemini(
+            reasoning_model,
+            0.75,  # Temperature ~0.4 for balanced reasoning
             thinking_budget=-1,
             include_thoughts=True,
         ).bind_tools(self.tools)
         
         # Drafting LLM (with structured output, no tools)
-        self.drafting_llm = ChatGoogleGenerativeAI(
-            model=drafting_model,
-            temperature=0.5,  # Temperature 0.0 for deterministic output
-            google_api_key=settings.GEMINI_API_KEY,
+        self.drafting_llm = get_gemini(
+            drafting_model,
+            0.5,  # Temperature 0.0 for deterministic output
         ).with_structured_output(PlanOutput)
         
         # Build the subgraph
@@ -125,137 +136,107 @@ class PlannerAgent:
     # -------------------------------------------------------------------------
     # NODE 1: REASONING (\"The Researcher\") - WITH STREAMING
     # -------------------------------------------------------------------------
-    def _reasoning_node(self, state: PlannerState) -> dict:
-        """
-        Reasoning node - Analyzes the request and decides on tool calls.
-        
-        Uses streaming to emit thought chunks in real-time.
-        In revision mode, uses REVISION_REASONING_PROMPT to produce change instructions.
-        """
-        messages = state["messages"]
-        iteration = state.get("iteration_count", 0)
-        is_revision = state.get("is_revision", False)
-        
+    def _reasoning_messages(self, state: PlannerState) -> list:
+        """Build the message list sent to the reasoning LLM for this iteration."""
         # Choose system prompt based on mode
-        if is_revision:
+        if state.get("is_revision", False):
             system_prompt = REVISION_REASONING_PROMPT
         else:
             system_prompt = REASONING_SYSTEM_PROMPT
         
-        system_msg = SystemMessage(content=system_prompt)
-        messages_to_send = [system_msg] + list(messages)
+        messages = list(state["messages"])
         
-        # Stream the reasoning LLM response
-        accumulated_text = ""
-        accumulated_thoughts = ""
-        accumulated_tool_calls = []
-        final_response = None
+        # Bound prefill: older rounds are folded into the opening request as a
+        # condensed digest instead of being resent in full every iteration.
+        # Cuts fall on an AIMessage, so tool calls stay paired with results
+        round_starts = [i for i, msg in enumerate(messages) if isinstance(msg, AIMessage)]
+        if len(round_starts) > REASONING_WINDOW_ROUNDS and isinstance(messages[0], HumanMessage):
+            cut = round_starts[-REASONING_WINDOW_ROUNDS]
+            opening = self._extract_text_content(messages[0].content)
+            digest = self._condense_rounds(messages[1:cut])
+            messages = [HumanMessage(content=f"{opening}\n\n{digest}")] + messages[cut:]
         
-        try:
-            for chunk in self.reasoning_llm.stream(messages_to_send):
-                # Process chunk content
-                if hasattr(chunk, 'content'):
-                    if isinstance(chunk.content, str) and chunk.content:
-                        # Direct string is treated as text output
-                        self._emit("message_chunk", content=chunk.content)
-                        accumulated_text += chunk.content
-                        accumulated_thoughts += chunk.content  # Add text to scratchpad as requested
-                        
-                    elif isinstance(chunk.content, list):
-                        for part in chunk.content:
-                            if isinstance(part, str) and part:
-                                # String in list is treated as text output
-                                self._emit("message_chunk", content=part)
-                                accumulated_text += part
-                                accumulated_thoughts += part  # Add text to scratchpad as requested
-                                
-                            elif isinstance(part, dict):
-                                if 'thinking' in part and part['thinking']:
-                                    # Thinking blocks
-                                    self._emit("thought_chunk", content=part['thinking'])
-                                    accumulated_thoughts += f"[Thinking] {part['thinking']}"
-                                    
-                                if 'text' in part and part['text']:
-                                    # Text blocks
-                                    self._emit("message_chunk", content=part['text'])
-                                    accumulated_text += part['text']
-                                    accumulated_thoughts += part['text']  # Add text to scratchpad as requested
-                
-                # Accumulate tool calls (they come at the end or as chunks)
-                if hasattr(chunk, 'tool_calls') and chunk.tool_calls:
-                    for tc in chunk.tool_calls:
-                        # Clean up tool call to only include required fields
-                        if isinstance(tc, dict) and 'name' in tc:
-                            clean_tc = {
-                                'name': tc['name'],
-                                'args': tc.get('args', {}),
-                                'id': tc.get('id', f"tool_{len(accumulated_tool_calls)}")
-                            }
-                            accumulated_tool_calls.append(clean_tc)
-                
-                # Skip tool_call_chunks - they contain 'index' which breaks AIMessage
-                # Complete tool_calls come at the end of streaming
-                
-                # Keep the last chunk as reference
-                final_response = chunk
-               
-                
-        except Exception as e:
-            print(f"Streaming error: {e}, falling back to invoke()")
-            # Fallback to non-streaming
-            response = self.reasoning_llm.invoke(messages_to_send)
-            thoughts = self._extract_text_content(response.content)
-            print("response: ",response)
-            print("thoughts: ",thoughts)
-            if thoughts:
-                self._emit("thought", content=thoughts)
-            if response.tool_calls:
-                for tool_call in response.tool_calls:
-                    self._emit("tool_call", tool_name=tool_call["name"], tool_args=tool_call["args"])
-            scratchpad = state.get("internal_scratchpad", "") or ""
-            if thoughts:
-                scratchpad += f"\n\n## Iteration {iteration + 1} - Reasoning\n{thoughts}"
-            return {
-                "messages": [response],
-                "internal_scratchpad": scratchpad,
-                "iteration_count": iteration + 1
-            }
+        return [SystemMessage(content=system_prompt)] + messages
+    
+    @staticmethod
+    def _clip(text: str, limit: int) -> str:
+        """Truncate text to limit characters, marking the cut."""
+        return text if len(text) <= limit else text[:limit] + "..."
+    
+    def _condense_rounds(self, messages: list) -> str:
+        """Digest of earlier reasoning rounds: capped reasoning, tool calls and results."""
+        lines = ["## Earlier research (condensed)"]
+        for msg in messages:
+            if isinstance(msg, AIMessage):
+                text = self._extract_text_content(msg.content)
+                if text:
+                    lines.append(f"Reasoning: {self._clip(text, CONDENSED_REASONING_CHARS)}")
+                for tc in msg.tool_calls or []:
+                    lines.append(f"Tool call: {tc['name']}({tc['args']})")
+            elif isinstance(msg, ToolMessage):
+                lines.append(f"Result from {msg.name}: {self._clip(str(msg.content), CONDENSED_TOOL_OUTPUT_CHARS)}")
+        return "\n".join(lines)
+    
+    def _clean_tool_calls(self, tool_calls: list, offset: int = 0) -> list:
+        """Reduce tool calls to the fields AIMessage accepts (drops chunk 'index' etc.)."""
+        cleaned = []
+        for tc in tool_calls or []:
+            if isinstance(tc, dict) and 'name' in tc:
+                cleaned.append({
+                    'name': tc['name'],
+                    'args': tc.get('args', {}),
+                    'id': tc.get('id', f"tool_{offset + len(cleaned)}")
+                })
+        return cleaned
+    
+    def _consume_chunk(self, chunk, tool_call_offset: int = 0) -> tuple:
+        """
+        Emit real-time events for a streamed chunk.
         
-        # Check if we got any content - if not, fallback to invoke
-        if not accumulated_text and not accumulated_tool_calls:
-            print("Streaming returned empty, falling back to invoke()")
-            response = self.reasoning_llm.invoke(messages_to_send)
-            thoughts = self._extract_text_content(response.content)
-            if thoughts:
-                self._emit("thought", content=thoughts)
-            if response.tool_calls:
-                for tool_call in response.tool_calls:
-                    self._emit("tool_call", tool_name=tool_call["name"], tool_args=tool_call["args"])
-            scratchpad = state.get("internal_scratchpad", "") or ""
-            if thoughts:
-                scratchpad += f"\n\n## Iteration {iteration + 1} - Reasoning\n{thoughts}"
-            return {
-                "messages": [response],
-                "internal_scratchpad": scratchpad,
-                "iteration_count": iteration + 1
-            }
+        Returns:
+            (text, thoughts, tool_calls) contributed by this chunk
+        """
+        text = ""
+        thoughts = ""
+        content = getattr(chunk, 'content', None)
+        
+        if isinstance(content, str) and content:
+            # Direct string is treated as text output
+            self._emit("message_chunk", content=content)
+            text += content
+            thoughts += content  # Add text to scratchpad as requested
+        elif isinstance(content, list):
+            for part in content:
+                if isinstance(part, str) and part:
+                    # String in list is treated as text output
+                    self._emit("message_chunk", content=part)
+                    text += part
+                    thoughts += part
+                elif isinstance(part, dict):
+                    if 'thinking' in part and part['thinking']:
+                        # Thinking blocks
+                        self._emit("thought_chunk", content=part['thinking'])
+                        thoughts += f"[Thinking] {part['thinking']}"
+                    if 'text' in part and part['text']:
+                        # Text blocks
+                        self._emit("message_chunk", content=part['text'])
+                        text += part['text']
+                        thoughts += part['text']
+        
+        # Skip tool_call_chunks - they contain 'index' which breaks AIMessage
+        # Complete tool_calls come at the end of streaming
+        tool_calls = self._clean_tool_calls(getattr(chunk, 'tool_calls', None), tool_call_offset)
+        return text, thoughts, tool_calls
+    
+    def _finalize_reasoning(self, accumulated_text: str, accumulated_thoughts: str,
+                            accumulated_tool_calls: list, scratchpad: str, iteration: int) -> dict:
+        """
+        Build the final AIMessage, emit persistence events and update the scratchpad.
         
-        # Build the final AIMessage from accumulated data
-        from langchain_core.messages import AIMessage as AIMsg
-        
-        # If we didn't get tool_calls during streaming, check the final chunk
-        if not accumulated_tool_calls and final_response:
-            if hasattr(final_response, 'tool_calls') and final_response.tool_calls:
-                for tc in final_response.tool_calls:
-                    if isinstance(tc, dict) and 'name' in tc:
-                        clean_tc = {
-                            'name': tc['name'],
-                            'args': tc.get('args', {}),
-                            'id': tc.get('id', f"tool_{len(accumulated_tool_calls)}")
-                        }
-                        accumulated_tool_calls.append(clean_tc)
-        
-        response = AIMsg(
+        Shared by the streaming path and the invoke() fallback so both emit
+        the same events and return the same state update.
+        """
+        response = AIMessage(
             content=accumulated_text,
             tool_calls=accumulated_tool_calls if accumulated_tool_calls else []
         )
@@ -276,14 +257,15 @@ class PlannerAgent:
             self._emit("message", content=accumulated_text)
         
         # Emit tool calls if present
-        if accumulated_tool_calls:
-            for tool_call in accumulated_tool_calls:
-                self._emit("tool_call", 
-                          tool_name=tool_call["name"], 
-                          tool_args=tool_call["args"])
+        for tool_call in accumulated_tool_calls:
+            self._emit("tool_call", 
+                      tool_name=tool_call["name"], 
+                      tool_args=tool_call["args"])
         
         # Update scratchpad with structured reasoning summary
-        scratchpad = state.get("internal_scratchpad", "") or ""
+        # (kept in full: it is not part of the per-iteration reasoning prompt,
+        # and the draftsman, Memory view and HITL revisions read all of it)
+        scratchpad = scratchpad or ""
         if accumulated_thoughts:
             scratchpad += f"\n\n## Iteration {iteration + 1} - Reasoning\n{accumulated_thoughts}"
         
@@ -293,50 +275,116 @@ class PlannerAgent:
             "iteration_count": iteration + 1
         }
     
-    # -------------------------------------------------------------------------
-    # NODE 2: TOOLS ("The Executor")
-    # -------------------------------------------------------------------------
-    def _tools_node(self, state: PlannerState) -> dict:
+    def _finalize_from_response(self, response, state: PlannerState) -> dict:
+        """Finalize the reasoning step from a complete (non-streamed) response."""
+        text = self._extract_text_content(response.content)
+        return self._finalize_reasoning(
+            text, text,
+            self._clean_tool_calls(getattr(response, 'tool_calls', None)),
+            state.get("internal_scratchpad", ""),
+            state.get("iteration_count", 0)
+        )
+    
+    @staticmethod
+    def _new_stream() -> dict:
+        """Running totals for one streamed reasoning response."""
+        return {"text": "", "thoughts": "", "tool_calls": [], "last_chunk": None}
+    
+    def _accumulate(self, stream: dict, chunk):
+        """Emit a streamed chunk's real-time events and fold it into the totals."""
+        text, thoughts, tool_calls = self._consume_chunk(chunk, len(stream["tool_calls"]))
+        stream["text"] += text
+        stream["thoughts"] += thoughts
+        stream["tool_calls"].extend(tool_calls)
+        # Keep the last chunk as reference
+        stream["last_chunk"] = chunk
+    
+    def _finish_stream(self, stream: dict, state: PlannerState) -> Optional[dict]:
         """
-        Tools node - Executes tool calls using LangGraph's prebuilt ToolNode.
+        Finalize a completed stream.
         
-        Uses the prebuilt ToolNode for reliable execution.
+        Returns None when the stream produced nothing usable and the caller
+        must fall back to a non-streamed (a)invoke().
         """
-        # Get the last message (should be AIMessage with tool_calls)
-        messages = state["messages"]
-        last_message = messages[-1]
+        if stream["text"] or stream["tool_calls"]:
+            return self._finalize_reasoning(
+                stream["text"], stream["thoughts"], stream["tool_calls"],
+                state.get("internal_scratchpad", ""), state.get("iteration_count", 0)
+            )
         
-        if not isinstance(last_message, AIMessage) or not last_message.tool_calls:
-            return {"messages": []}
+        # Reuse the last streamed chunk if it already carries a complete message
+        last_chunk = stream["last_chunk"]
+        if last_chunk is not None and (getattr(last_chunk, 'content', None) or getattr(last_chunk, 'tool_calls', None)):
+            logger.debug("Streaming accumulated nothing, reusing final streamed response")
+            return self._finalize_from_response(last_chunk, state)
         
-        # Execute tools and collect results
-        tool_messages = []
-        for tool_call in last_message.tool_calls:
-            tool_name = tool_call["name"]
-            tool_args = tool_call["args"]
-            tool_id = tool_call.get("id", f"tool_{tool_name}")
-            
-            # Execute the tool
-            tool = self.tools_by_name.get(tool_name)
-            if tool:
-                try:
-                    result = tool.invoke(tool_args)
-                except Exception as e:
-                    result = f"Tool execution error: {str(e)}"
-            else:
-                result = f"Tool '{tool_name}' not found."
-            
+        logger.debug("Streaming returned empty, falling back to invoke")
+        return None
+    
+    def _reasoning_node(self, state: PlannerState) -> dict:
+        """
+        Reasoning node - Analyzes the request and decides on tool calls.
+        
+        Uses streaming to emit thought chunks in real-time.
+        In revision mode, uses REVISION_REASONING_PROMPT to produce change instructions.
+        """
+        messages_to_send = self._reasoning_messages(state)
+        stream = self._new_stream()
+        
+        try:
+            for chunk in self.reasoning_llm.stream(messages_to_send):
+                self._accumulate(stream, chunk)
+        except Exception as e:
+            logger.warning("Reasoning stream failed, falling back to invoke: %s", e)
+            result = None
+        else:
+            result = self._finish_stream(stream, state)
+        
+        if result is None:
+            result = self._finalize_from_response(self.reasoning_llm.invoke(messages_to_send), state)
+        return result
+    
+    async def _reasoning_node_async(self, state: PlannerState) -> dict:
+        """Async variant of _reasoning_node, used when the subgraph runs via astream/ainvoke."""
+        messages_to_send = self._reasoning_messages(state)
+        stream = self._new_stream()
+        
+        try:
+            async for chunk in self.reasoning_llm.astream(messages_to_send):
+                self._accumulate(stream, chunk)
+        except Exception as e:
+            logger.warning("Reasoning stream failed, falling back to invoke: %s", e)
+            result = None
+        else:
+            result = self._finish_stream(stream, state)
+        
+        if result is None:
+            result = self._finalize_from_response(await self.reasoning_llm.ainvoke(messages_to_send), state)
+        return result
+    
+    # -------------------------------------------------------------------------
+    # NODE 2: TOOLS ("The Executor")
+    # -------------------------------------------------------------------------
+    def _emit_tool_results(self, state: PlannerState, result: dict) -> dict:
+        """Emit a tool_result event for each ToolMessage produced by the ToolNode."""
+        last_message = state["messages"][-1]
+        args_by_id = {tc.get("id"): tc.get("args", {}) for tc in getattr(last_message, "tool_calls", None) or []}
+        
+        for tool_message in result.get("messages", []):
             # Emit tool result (with args so history has complete info)
-            self._emit("tool_result", tool_name=tool_name, tool_output=str(result), tool_args=tool_args)
-            
-            # Create ToolMessage
-            tool_messages.append(ToolMessage(
-                tool_call_id=tool_id,
-                content=str(result),
-                name=tool_name
-            ))
-        
-        return {"messages": tool_messages}
+            self._emit("tool_result", 
+                      tool_name=tool_message.name, 
+                      tool_output=str(tool_message.content), 
+                      tool_args=args_by_id.get(tool_message.tool_call_id))
+        return result
+    
+    def _tools_node(self, state: PlannerState) -> dict:
+        """Execute tool calls via the prebuilt ToolNode and emit their results."""
+        return self._emit_tool_results(state, self.tool_node.invoke(state))
+    
+    async def _tools_node_async(self, state: PlannerState) -> dict:
+        """Async variant of _tools_node; ToolNode gathers the calls concurrently."""
+        return self._emit_tool_results(state, await self.tool_node.ainvoke(state))
     
     # -------------------------------------------------------------------------
     # NODE 3: DRAFTING ("The Writer")
@@ -367,9 +415,11 @@ class PlannerAgent:
             system_prompt = REVISION_DRAFTING_PROMPT
             
             # Parse previous plan to extract specific items
+            # (reuse the dict parsed once in invoke() when available)
             try:
-                import json
-                prev_plan_dict = json.loads(previous_plan) if previous_plan else {}
+                prev_plan_dict = state.get("parsed_previous_plan")
+                if prev_plan_dict is None:
+                    prev_plan_dict = orjson.loads(previous_plan) if previous_plan else {}
                 evidence_anchors = prev_plan_dict.get("evidence_anchors", [])
                 evidence_count = len(evidence_anchors)
                 # Create explicit list of existing anchors
@@ -384,37 +434,17 @@ class PlannerAgent:
             # Get the last AIMessage which contains the change instructions
             change_instructions = ""
             for msg in reversed(messages):
-                if type(msg).__name__ == "AIMessage" and not getattr(msg, 'tool_calls', None):
+                if isinstance(msg, AIMessage) and not msg.tool_calls:
                     change_instructions = self._extract_text_content(msg.content)
                     break
             
-            human_content = f"""YOU MUST APPLY THE CHANGES BELOW. DO NOT JUST COPY THE PREVIOUS PLAN.
-
-## CHANGE INSTRUCTIONS (from reasoning node):
-{change_instructions}
-
----
-
-## CURRENT EVIDENCE ANCHORS IN PREVIOUS PLAN ({evidence_count} items):
-{existing_anchors_str}
-
-## IF THE INSTRUCTIONS SAY "ADD EVIDENCE ANCHOR":
-Your output MUST have {evidence_count + 1} evidence anchors:
-- All {evidence_count} existing ones listed above
-- PLUS the new one from the change instructions
-
----
-
-## PREVIOUS PLAN (base for your revisions):
-```json
-{previous_plan}
-```
-
-## YOUR TASK:
-1. Read the CHANGE INSTRUCTIONS carefully
-2. Apply EACH change to the previous plan
-3. Your output must reflect the changes
-4. If adding an evidence anchor, your output must have {evidence_count + 1} anchors"""
+            human_content = REVISION_DRAFTING_TMPL.format_map({
+                "change_instructions": change_instructions,
+                "evidence_count": evidence_count,
+                "existing_anchors": existing_anchors_str,
+                "target_count": evidence_count + 1,
+                "previous_plan": previous_plan,
+            })
         else:
             # FRESH MODE: Synthesize from scratch
             system_prompt = DRAFTING_SYSTEM_PROMPT
@@ -517,8 +547,9 @@ Your output MUST have {evidence_count + 1} evidence anchors:
         graph = StateGraph(PlannerState)
         
         # Add nodes
-        graph.add_node("reasoning", self._reasoning_node)
-        graph.add_node("tools", self._tools_node)
+        # Sync invoke() uses the streaming node, astream()/ainvoke() the native async one
+        graph.add_node("reasoning", RunnableLambda(self._reasoning_node, afunc=self._reasoning_node_async))
+        graph.add_node("tools", RunnableLambda(self._tools_node, afunc=self._tools_node_async))
         graph.add_node("drafting", self._drafting_node)
         
         # Set entry point
@@ -588,13 +619,22 @@ Your output MUST have {evidence_count + 1} evidence anchors:
         initial_scratchpad = previous_scratchpad if revision_count > 0 else ""
         is_revision_mode = revision_count > 0 and bool(previous_plan)
         
+        # Parse the previous plan once for the whole revision round
+        parsed_previous_plan = None
+        if is_revision_mode:
+            try:
+                parsed_previous_plan = orjson.loads(previous_plan)
+            except orjson.JSONDecodeError:
+                parsed_previous_plan = None
+        
         initial_state: PlannerState = {
             "messages": [HumanMessage(content=content)],
             "internal_scratchpad": initial_scratchpad,
             "final_plan_output": None,
             "iteration_count": 0,
             "is_revision": is_revision_mode,
-            "previous_plan": previous_plan if is_revision_mode else None
+            "previous_plan": previous_plan if is_revision_mode else None,
+            "parsed_previous_plan": parsed_previous_plan
         }
         
         # Run the subgraph (planner decides if tools are needed)
@@ -605,8 +645,10 @@ Your output MUST have {evidence_count + 1} evidence anchors:
         
         if plan_output:
             plan_str = json.dumps(plan_output.model_dump(), indent=2)
+            plan_user_preview = plan_output.user_preview
         else:
             plan_str = "{}"
+            plan_user_preview = ""
         
         # Emit agent memory for the Memory popup
         self._emit(
@@ -617,6 +659,7 @@ Your output MUST have {evidence_count + 1} evidence anchors:
         
         return {
             "plan": plan_str,
+            "plan_user_preview": plan_user_preview,
             "planner_scratchpad": final_state.get("internal_scratchpad", ""),
             "planner_trace": []  # Trace is streamed via events
         }
@@ -628,47 +671,13 @@ Your output MUST have {evidence_count + 1} evidence anchors:
         
         The reasoning node should analyze the feedback and produce instructions for the drafting node.
         """
-        return f"""[PLAN REVISION #{count}]
-
-## Original User Request
-{query}
-
-## Current Plan (what needs to be revised)
-```json
-{plan}
-```
-
-## Previous Reasoning & Tool Outputs
-{scratchpad if scratchpad else "(No previous reasoning available)"}
-
-## User's Requested Changes
-{feedback}
-
-## YOUR TASK - PRODUCE CHANGE INSTRUCTIONS
-
-Analyze the user's feedback and determine what changes are needed.
-
-1. If the user's feedback requires NEW information (e.g., "add more evidence"):
-   - Call the appropriate tool to gather that information
-   - Include the new information in your change instructions
-
-2. If the feedback is structural (e.g., "add more steps"):
-   - No tools needed
-   - Just describe what needs to change
-
-## OUTPUT FORMAT
-Provide clear CHANGE INSTRUCTIONS for the drafting node:
-
-```
-CHANGE INSTRUCTIONS:
-1. [field_name]: [what to add/modify/remove]
-2. [field_name]: [what to add/modify/remove]
-...
-```
-
-⚠️ DO NOT output the final revised plan JSON - that's the drafting node's job.
-Just describe the changes that need to be made.
-"""
+        return REVISION_PROMPT_TMPL.format_map({
+            "count": count,
+            "query": query,
+            "plan": plan,
+            "scratchpad": scratchpad if scratchpad else "(No previous reasoning available)",
+            "feedback": feedback,
+        })
     
     async def astream(self, state: dict):
         """
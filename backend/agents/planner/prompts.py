@@ -158,3 +158,79 @@ Before outputting, verify:
 □ Did I preserve ALL fields that weren't mentioned for change?
 □ If adding to a list, does my output have MORE items than the original?"""
 
+
+
+# =============================================================================
+# REVISION TEMPLATES (filled via str.format_map)
+# =============================================================================
+
+REVISION_PROMPT_TMPL = """[PLAN REVISION #{count}]
+
+## Original User Request
+{query}
+
+## Current Plan (what needs to be revised)
+```json
+{plan}
+```
+
+## Previous Reasoning & Tool Outputs
+{scratchpad}
+
+## User's Requested Changes
+{feedback}
+
+## YOUR TASK - PRODUCE CHANGE INSTRUCTIONS
+
+Analyze the user's feedback and determine what changes are needed.
+
+1. If the user's feedback requires NEW information (e.g., "add more evidence"):
+   - Call the appropriate tool to gather that information
+   - Include the new information in your change instructions
+
+2. If the feedback is structural (e.g., "add more steps"):
+   - No tools needed
+   - Just describe what needs to change
+
+## OUTPUT FORMAT
+Provide clear CHANGE INSTRUCTIONS for the drafting node:
+
+```
+CHANGE INSTRUCTIONS:
+1. [field_name]: [what to add/modify/remove]
+2. [field_name]: [what to add/modify/remove]
+...
+```
+
+⚠️ DO NOT output the final revised plan JSON - that's the drafting node's job.
+Just describe the changes that need to be made.
+"""
+
+
+REVISION_DRAFTING_TMPL = """YOU MUST APPLY THE CHANGES BELOW. DO NOT JUST COPY THE PREVIOUS PLAN.
+
+## CHANGE INSTRUCTIONS (from reasoning node):
+{change_instructions}
+
+---
+
+## CURRENT EVIDENCE ANCHORS IN PREVIOUS PLAN ({evidence_count} items):
+{existing_anchors}
+
+## IF THE INSTRUCTIONS SAY "ADD EVIDENCE ANCHOR":
+Your output MUST have {target_count} evidence anchors:
+- All {evidence_count} existing ones listed above
+- PLUS the new one from the change instructions
+
+---
+
+## PREVIOUS PLAN (base for your revisions):
+```json
+{previous_plan}
+```
+
+## YOUR TASK:
+1. Read the CHANGE INSTRUCTIONS carefully
+2. Apply EACH change to the previous plan
+3. Your output must reflect the changes
+4. If adding an evidence anchor, your output must have {target_count} anchors"""
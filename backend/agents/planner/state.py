@@ -29,5 +29,8 @@ class PlannerState(TypedDict):
     
     # HITL: Store previous plan JSON for revision mode
     previous_plan: Optional[str]
+    
+    # HITL: previous plan parsed once in invoke() so revision nodes skip json parsing
+    parsed_previous_plan: Optional[dict]
 
 
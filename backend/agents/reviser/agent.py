@@ -6,16 +6,82 @@ to address identified issues while preserving clinical integrity.
 """
 
 import json
+import string
+import asyncio
+import functools
+import hashlib
 from datetime import datetime
+from types import MappingProxyType
 from typing import Dict, Any, List
-from langchain_google_genai import ChatGoogleGenerativeAI
+
+import orjson
 from langchain_core.messages import SystemMessage, HumanMessage
 
-from backend.settings import settings
+from backend.llm import get_gemini, run_sync
 from backend.events import get_emitter
 
 from backend.agents.reviser.state import ReviserState
-from backend.agents.reviser.prompts import REVISER_PROMPT, REVISION_SUMMARY_PROMPT
+from backend.agents.reviser.prompts import (
+    REVISER_PROMPT, REVISER_INPUT_PROMPT, REVISION_SUMMARY_PROMPT
+)
+
+
+# --- Configuration ---
+SUMMARY_DRAFT_TOKEN_BUDGET = 800  # Max tokens of the draft sent to the summary prompt
+CHARS_PER_TOKEN = 4               # Gemini's documented average for English text
+TRUNCATION_MARKER = "\n…[truncated]…\n"
+FALLBACK_REVISION_SUMMARY = "Revision applied based on critique feedback."
+SKIPPED_REVISION_SUMMARY = "No new action items since the last revision; draft left unchanged."
+
+
+def _truncate_to_tokens(text: str, max_tokens: int, head_ratio: float = 0.75) -> str:
+    """
+    Truncate text to roughly max_tokens, keeping the head and the tail.
+    
+    Uses the chars-per-token estimate instead of a tokenizer round trip;
+    slicing a str is by code point, so multibyte characters are never split.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    head_chars = int(max_chars * head_ratio)
+    tail_chars = max_chars - head_chars
+    return text[:head_chars] + TRUNCATION_MARKER + text[-tail_chars:]
+
+
+def _hash_action_items(action_items: List[str]) -> str:
+    """Order-insensitive digest of the critic's action items."""
+    return hashlib.blake2b(orjson.dumps(sorted(action_items)), digest_size=16).hexdigest()
+
+
+def _split_template(template: str) -> tuple:
+    """Split a str.format template into its literal chunks around each {field}."""
+    return tuple(literal for literal, _, _, _ in string.Formatter().parse(template))
+
+
+# Literal chunks of the per-call templates, computed once at import.
+# The placeholders are filled by "".join() in field order.
+(_INPUT_PREFIX, _INPUT_AFTER_CONSTRAINTS, _INPUT_AFTER_CRITIQUE,
+ _INPUT_AFTER_ACTIONS, _INPUT_SUFFIX) = _split_template(REVISER_INPUT_PROMPT)
+(_SUMMARY_PREFIX, _SUMMARY_AFTER_ORIGINAL,
+ _SUMMARY_SUFFIX) = _split_template(REVISION_SUMMARY_PROMPT)
+
+
+@functools.lru_cache(maxsize=32)
+def _format_protocol_constraints(forbidden_content: tuple, required_components: tuple,
+                                 style_rules: tuple) -> str:
+    """Serialize the protocol constraints block; memoized since the plan is fixed across revisions."""
+    return orjson.dumps({
+        "forbidden_content": list(forbidden_content),
+        "required_components": list(required_components),
+        "style_rules": list(style_rules)
+    }, option=orjson.OPT_INDENT_2).decode()
+
+
+@functools.lru_cache(maxsize=32)
+def _parse_plan(plan_str: str) -> MappingProxyType:
+    """Parse the plan JSON once per distinct string; returned read-only since it is shared."""
+    return MappingProxyType(orjson.loads(plan_str))
 
 
 class ReviserAgent:
@@ -40,18 +106,19 @@ class ReviserAgent:
             model: LLM model for revision
             temperature: Moderate temperature for creative but controlled edits
         """
-        self.reviser_llm = ChatGoogleGenerativeAI(
-            model=model,
-            temperature=temperature,
-            google_api_key=settings.GEMINI_API_KEY,
-        )
-        
-        # Lower temperature for summary generation
-        self.summary_llm = ChatGoogleGenerativeAI(
-            model=model,
-            temperature=0.2,
-            google_api_key=settings.GEMINI_API_KEY,
-        )
+        # LLM clients are built lazily on first use (see reviser_llm / summary_llm)
+        self.model = model
+        self.temperature = temperature
+    
+    @functools.cached_property
+    def reviser_llm(self):
+        """Revision LLM, resolved from the shared client cache on first use."""
+        return get_gemini(self.model, self.temperature)
+    
+    @functools.cached_property
+    def summary_llm(self):
+        """Lower temperature LLM for summary generation, resolved on first use."""
+        return get_gemini(self.model, 0.2)
     
     # =========================================================================
     # EVENT EMISSION HELPERS
@@ -66,6 +133,8 @@ class ReviserAgent:
                 emitter.emit_thought_chunk("reviser", kwargs.get("content", ""))
             elif event_type == "message_chunk":
                 emitter.emit_message_chunk("reviser", kwargs.get("content", ""))
+            elif event_type == "message_begin":
+                emitter.begin_message("reviser", kwargs.get("persist", False))
             elif event_type == "message_end":
                 emitter.emit_message_end("reviser")
             elif event_type == "message":
@@ -91,88 +160,147 @@ class ReviserAgent:
     # =========================================================================
     # REVISION LOGIC
     # =========================================================================
-    def _revise_draft(self, state: ReviserState) -> str:
+    async def _revise_draft(self, state: ReviserState, stream: bool = True) -> str:
         """
         Apply revisions to the draft based on critique.
         
+        Args:
+            state: Internal reviser state
+            stream: Stream the LLM response; batch mode disables this, and it
+                    is skipped automatically when no emitter is registered
+        
         Returns the revised draft content.
         """
-        current_draft = state["current_draft"]
-        critique_document = state.get("critique_document", "")
-        critique_data = state.get("critique_data", {})
-        plan = state.get("plan", {})
-        protocol_contract = state.get("protocol_contract", {})
+        current_draft = state.current_draft
+        critique_document = state.critique_document
+        plan = state.plan or {}
         
-        # Extract action items from critique
-        action_items = critique_data.get("action_items", [])
-        if not action_items:
+        # Action items are pre-rendered once per invocation
+        action_items_block = state.action_items_block
+        n_actions = state.n_actions
+        if not n_actions:
             # Try to extract from the markdown critique
-            action_items = ["Review and address all issues mentioned in the critique document"]
-        
-        # Format protocol constraints
-        protocol_constraints = json.dumps({
-            "forbidden_content": plan.get("safety_envelope", {}).get("forbidden_content", []),
-            "required_components": plan.get("drafting_spec", {}).get("required_fields", []),
-            "style_rules": plan.get("drafting_spec", {}).get("style_rules", [])
-        }, indent=2)
-        
-        # Format the revision prompt
-        formatted_prompt = REVISER_PROMPT.format(
-            protocol_constraints=protocol_constraints,
-            critique_document=critique_document,
-            action_items="\n".join(f"- {item}" for item in action_items),
-            current_draft=current_draft
+            action_items_block = "- Review and address all issues mentioned in the critique document"
+            n_actions = 1
+        
+        # Format protocol constraints (cached across revisions of the same plan)
+        protocol_constraints = _format_protocol_constraints(
+            tuple(plan.get("safety_envelope", {}).get("forbidden_content", [])),
+            tuple(plan.get("drafting_spec", {}).get("required_fields", [])),
+            tuple(plan.get("drafting_spec", {}).get("style_rules", []))
         )
         
-        self._emit("message_chunk", content=f"Applying {len(action_items)} revision action items...")
+        # Format the per-call revision inputs (the system prompt stays static)
+        revision_input = "".join((
+            _INPUT_PREFIX, protocol_constraints,
+            _INPUT_AFTER_CONSTRAINTS, critique_document,
+            _INPUT_AFTER_CRITIQUE, action_items_block,
+            _INPUT_AFTER_ACTIONS, current_draft,
+            _INPUT_SUFFIX
+        ))
+        
+        self._emit("message_begin", persist=True)  # Emitter persists the buffered message on end
+        self._emit("message_chunk", content=f"Applying {n_actions} revision action items...")
         self._emit("message_end")
-        self._emit("message", content=f"Applying {len(action_items)} revision action items...")  # For persistence
         
-        # Stream the revision for real-time visibility
-        accumulated_content = ""
+        revision_messages = [
+            SystemMessage(content=REVISER_PROMPT),
+            HumanMessage(content=revision_input)
+        ]
         
-        for chunk in self.reviser_llm.stream([
-            SystemMessage(content=formatted_prompt),
-            HumanMessage(content="Produce the revised draft now. Output only the improved Markdown content.")
-        ]):
-            if hasattr(chunk, 'content') and chunk.content:
-                content = chunk.content if isinstance(chunk.content, str) else str(chunk.content)
-                accumulated_content += content
+        # Nobody is listening (batch mode, tests, no websocket): skip streaming overhead
+        if not stream or get_emitter() is None:
+            response = await self.reviser_llm.ainvoke(revision_messages)
+            content = response.content if isinstance(response.content, str) else str(response.content)
+            return content if content else current_draft
         
+        # Stream the revision to the UI as it is generated
+        parts = []
+        
+        async for chunk in self.reviser_llm.astream(revision_messages):
+            content = getattr(chunk, 'content', None)
+            if content:
+                content = content if isinstance(content, str) else str(content)
+                parts.append(content)
+                self._emit("message_chunk", content=content)
+        self._emit("message_end")  # Draft is persisted via the artifact event, not as a message
+        
+        accumulated_content = "".join(parts)
         return accumulated_content if accumulated_content else current_draft
     
-    def _generate_revision_summary(
+    async def _generate_revision_summary(
         self,
         original_draft: str,
-        revised_draft: str,
-        action_items: List[str]
+        action_items_block: str
     ) -> str:
-        """Generate a brief summary of changes made."""
+        """
+        Generate a brief summary of the changes being made.
+        
+        Only depends on the original draft and the action items, so it can
+        run concurrently with the revision itself.
+        """
         try:
-            formatted_prompt = REVISION_SUMMARY_PROMPT.format(
-                original_draft=original_draft[:2000],  # Truncate for context
-                revised_draft=revised_draft[:2000],
-                action_items="\n".join(f"- {item}" for item in action_items)
-            )
+            formatted_prompt = "".join((
+                _SUMMARY_PREFIX, _truncate_to_tokens(original_draft, SUMMARY_DRAFT_TOKEN_BUDGET),
+                _SUMMARY_AFTER_ORIGINAL, action_items_block,
+                _SUMMARY_SUFFIX
+            ))
             
-            response = self.summary_llm.invoke([
+            response = await self.summary_llm.ainvoke([
                 SystemMessage(content=formatted_prompt),
                 HumanMessage(content="Summarize the key changes in 3-5 bullet points.")
             ])
             
             return response.content if hasattr(response, 'content') else str(response)
-        except:
-            return "Revision applied based on critique feedback."
+        except Exception as e:
+            # The summary is cosmetic: never let it fail the revision
+            self._emit("status", content=f"Revision summary unavailable: {e}")
+            return FALLBACK_REVISION_SUMMARY
     
     # =========================================================================
     # PUBLIC INTERFACE
     # =========================================================================
     def invoke(self, state: dict) -> dict:
+        """
+        Synchronous wrapper around ainvoke() for scripts without an event loop.
+        
+        Raises RuntimeError inside a running loop (the graph awaits ainvoke()).
+        """
+        return run_sync(self.ainvoke(state))
+    
+    def invoke_batch(self, states: List[dict], max_concurrency: int = 4) -> List[dict]:
+        """Synchronous wrapper around ainvoke_batch() (scripts only, like invoke())."""
+        return run_sync(self.ainvoke_batch(states, max_concurrency))
+    
+    async def ainvoke_batch(self, states: List[dict], max_concurrency: int = 4) -> List[dict]:
+        """
+        Revise several drafts concurrently (offline regeneration / evals).
+        
+        Streaming is disabled and at most max_concurrency revisions are in
+        flight at once.
+        
+        Args:
+            states: Input states, each shaped like the one passed to invoke()
+            max_concurrency: Maximum number of concurrent revisions
+            
+        Returns:
+            Results in the same order as states
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def _bounded(state: dict) -> dict:
+            async with semaphore:
+                return await self.ainvoke(state, stream=False)
+        
+        return await asyncio.gather(*(_bounded(state) for state in states))
+    
+    async def ainvoke(self, state: dict, stream: bool = True) -> dict:
         """
         Execute the revision process.
         
         Args:
             state: Input state with 'current_draft', 'critique_document', 'plan'
+            stream: Stream the revision LLM response (disabled in batch mode)
             
         Returns:
             dict with 'current_draft' (revised), 'draft_versions' (updated list)
@@ -190,44 +318,55 @@ class ReviserAgent:
         iteration = state.get("reflection_iteration", 1)
         draft_versions = state.get("draft_versions", [])
         
-        # Parse plan if string
+        # Parse plan if string (memoized: the plan is unchanged across reflection iterations)
         try:
-            plan = json.loads(plan_str) if isinstance(plan_str, str) else plan_str
-        except json.JSONDecodeError:
+            plan = _parse_plan(plan_str) if isinstance(plan_str, str) else plan_str
+        except orjson.JSONDecodeError:
             plan = {}
         
-        # Build internal state
-        reviser_state: ReviserState = {
-            "current_draft": current_draft,
-            "critique_document": critique_document,
-            "critique_data": critique_data,
-            "plan": plan,
-            "protocol_contract": state.get("protocol_contract"),
-            "revised_draft": None,
-            "revision_notes": None
-        }
-        
-        # Perform revision
-        revised_draft = self._revise_draft(reviser_state)
-        
-        # Generate revision summary
         action_items = critique_data.get("action_items", [])
-        revision_summary = self._generate_revision_summary(
-            current_draft, revised_draft, action_items
+        action_items_hash = _hash_action_items(action_items)
+        action_items_block = "\n".join(f"- {item}" for item in action_items)
+        n_actions = len(action_items)
+        
+        # Build internal state
+        reviser_state = ReviserState(
+            current_draft=current_draft,
+            critique_document=critique_document,
+            critique_data=critique_data,
+            plan=plan,
+            protocol_contract=state.get("protocol_contract"),
+            prev_action_items_hash=state.get("prev_action_items_hash"),
+            action_items_block=action_items_block,
+            n_actions=n_actions
         )
         
+        if action_items_hash == reviser_state.prev_action_items_hash:
+            # Same action items as the previous iteration: a new LLM pass would
+            # produce a near-identical draft, so keep the current one
+            revised_draft = current_draft
+            revision_summary = SKIPPED_REVISION_SUMMARY
+            version_status = "skipped"
+        else:
+            # Perform revision and generate the summary concurrently
+            revised_draft, revision_summary = await asyncio.gather(
+                self._revise_draft(reviser_state, stream=stream),
+                self._generate_revision_summary(current_draft, action_items_block)
+            )
+            version_status = "revised"
+        
         # Create new version entry
         new_version = {
             "version": len(draft_versions) + 1,
             "content": revised_draft,
             "timestamp": datetime.now().isoformat(),
-            "status": "revised",
+            "status": version_status,
             "iteration": iteration,
             "changes": revision_summary
         }
         
-        # Append to version history
-        updated_versions = list(draft_versions) + [new_version]
+        # Append to version history (single allocation, no intermediate copy)
+        updated_versions = [*draft_versions, new_version]
         
         # Emit the revised draft as artifact
         self._emit(
@@ -239,31 +378,33 @@ class ReviserAgent:
         
         # Emit summary message
         msg_content = f"**Revision Complete (v{new_version['version']})**\n\n{revision_summary}"
+        self._emit("message_begin", persist=True)
         self._emit("message_chunk", content=msg_content)
         self._emit("message_end")
-        self._emit("message", content=msg_content)  # For persistence
         
-        # Build messages for Memory popup
-        memory_messages = [
-            {"type": "SystemMessage", "content": "Reviser Prompt - Apply critique feedback to improve draft"},
-            {"type": "HumanMessage", "content": f"Action items to apply: {len(action_items)} items\n\nCritique summary: {critique_document[:300]}..."},
-            {"type": "AIMessage", "content": f"Revision complete. Created v{new_version['version']}.\n\nChanges made:\n{revision_summary}"}
-        ]
-        
-        # Build scratchpad for Memory popup
-        scratchpad = f"# Reviser Agent - Iteration {iteration}\n\n"
-        scratchpad += f"## Action Items Applied ({len(action_items)})\n"
-        for item in action_items:
-            scratchpad += f"- {item}\n"
-        scratchpad += f"\n## Revision Summary\n{revision_summary}\n"
-        scratchpad += f"\n## Version Created\n- Version: v{new_version['version']}\n- Status: {new_version['status']}\n"
-        
-        # Emit agent memory with messages
-        self._emit(
-            "agent_memory",
-            messages=memory_messages,
-            scratchpad=scratchpad
-        )
+        # Memory popup payload is only built when a UI consumer is attached
+        if get_emitter() is not None:
+            # Build messages for Memory popup
+            memory_messages = [
+                {"type": "SystemMessage", "content": "Reviser Prompt - Apply critique feedback to improve draft"},
+                {"type": "HumanMessage", "content": f"Action items to apply: {n_actions} items\n\nCritique summary: {critique_document[:300]}..."},
+                {"type": "AIMessage", "content": f"Revision complete. Created v{new_version['version']}.\n\nChanges made:\n{revision_summary}"}
+            ]
+            
+            # Build scratchpad for Memory popup
+            scratchpad = f"# Reviser Agent - Iteration {iteration}\n\n"
+            scratchpad += f"## Action Items Applied ({n_actions})\n"
+            if action_items_block:
+                scratchpad += f"{action_items_block}\n"
+            scratchpad += f"\n## Revision Summary\n{revision_summary}\n"
+            scratchpad += f"\n## Version Created\n- Version: v{new_version['version']}\n- Status: {new_version['status']}\n"
+            
+            # Emit agent memory with messages
+            self._emit(
+                "agent_memory",
+                messages=memory_messages,
+                scratchpad=scratchpad
+            )
         
         # Increment iteration for next loop
         return {
@@ -271,7 +412,8 @@ class ReviserAgent:
             "draft": revised_draft,  # Also update main draft field
             "draft_versions": updated_versions,
             "reflection_iteration": iteration + 1,
-            "revision_notes": revision_summary
+            "revision_notes": revision_summary,
+            "prev_action_items_hash": action_items_hash
         }
 
 
@@ -36,7 +36,17 @@ Address issues in this order:
 - Keep the same reading level
 - Preserve word count approximately (±20%)
 
-## Protocol Constraints (MUST NOT VIOLATE)
+## Your Task
+The protocol constraints, critique document, action items and current draft are provided in the next message.
+Produce a revised draft that addresses ALL action items while maintaining the draft's clinical integrity and therapeutic value.
+
+Output the complete revised draft in Markdown format. Do not include explanations - just output the improved draft."""
+
+
+# Per-call inputs for the reviser. Kept out of REVISER_PROMPT so the system
+# prompt is a byte-identical prefix on every call and eligible for Gemini's
+# implicit context caching.
+REVISER_INPUT_PROMPT = """## Protocol Constraints (MUST NOT VIOLATE)
 {protocol_constraints}
 
 ## Critique Document
@@ -48,21 +58,15 @@ Address issues in this order:
 ## Current Draft
 {current_draft}
 
-## Your Task
-Produce a revised draft that addresses ALL action items while maintaining the draft's clinical integrity and therapeutic value.
+Produce the revised draft now. Output only the improved Markdown content."""
 
-Output the complete revised draft in Markdown format. Do not include explanations - just output the improved draft."""
 
-
-REVISION_SUMMARY_PROMPT = """Based on the original draft and the revised draft, briefly summarize what changes were made.
+REVISION_SUMMARY_PROMPT = """Based on the original draft and the action items being applied to it, briefly summarize what changes are being made.
 
 ## Original Draft
 {original_draft}
 
-## Revised Draft  
-{revised_draft}
-
-## Action Items That Were Addressed
+## Action Items Being Addressed
 {action_items}
 
-Provide a brief bullet-point summary of the key changes made. Be specific about which sections were modified and how."""
+Provide a brief bullet-point summary of the key changes. Be specific about which sections are modified and how."""
@@ -1,21 +1,29 @@
 """
-State TypedDict for Reviser Agent.
+State dataclass for Reviser Agent.
 """
 
-from typing import TypedDict, Optional, Dict, Any, List
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Mapping
 
 
-class ReviserState(TypedDict):
+@dataclass(slots=True)
+class ReviserState:
     """
     Internal state for the Reviser Agent.
+    
+    Purely internal (never passed through LangGraph), so a slotted dataclass
+    is used instead of a TypedDict for cheaper attribute access.
     """
     # Input
-    current_draft: str                          # Draft to revise
-    critique_document: str                      # Markdown critique from critic
-    critique_data: Optional[Dict[str, Any]]     # Structured critique data
-    plan: Dict[str, Any]                        # Original plan for constraints
-    protocol_contract: Optional[Dict[str, Any]] # Protocol constraints
+    current_draft: str                                  # Draft to revise
+    critique_document: str = ""                         # Markdown critique from critic
+    critique_data: Optional[Dict[str, Any]] = None      # Structured critique data
+    plan: Optional[Mapping[str, Any]] = None            # Original plan for constraints
+    protocol_contract: Optional[Dict[str, Any]] = None  # Protocol constraints
+    prev_action_items_hash: Optional[str] = None        # Action items digest from the last iteration
+    action_items_block: str = ""                        # Action items pre-rendered as a bullet list
+    n_actions: int = 0                                  # Number of action items
     
     # Output
-    revised_draft: Optional[str]                # The revised draft
-    revision_notes: Optional[str]               # Notes about what was changed
+    revised_draft: Optional[str] = None                 # The revised draft
+    revision_notes: Optional[str] = None                # Notes about what was changed
@@ -1,10 +1,50 @@
-import json
 import re
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+import time
+import hashlib
+import threading
+from typing import Literal, Dict, Tuple
+from pydantic import BaseModel, Field
+from langchain_core.prompts import SystemMessagePromptTemplate
+from langchain_core.messages import HumanMessage
+from langchain_core.exceptions import OutputParserException
 
-from backend.settings import settings
+from backend.llm import get_gemini
+
+
+# =============================================================================
+# FAST-PATH CLASSIFICATION (no LLM call)
+# =============================================================================
+_GREETING_RE = re.compile(r'^\s*(hi|hello|hey|good (morning|afternoon|evening))[\s!.?]*$', re.I)
+_THANKS_RE = re.compile(r'^\s*(thanks?|thank you)[\s!.?]*$', re.I)
+_FAREWELL_RE = re.compile(r'^\s*(bye|goodbye|good night)[\s!.?]*$', re.I)
+# Draftsman fast path: the message must both hand a plan over ("here's my
+# plan:", "draft this") and actually carry one (at least two steps or numbered
+# items). Anything short of that, e.g. "can you draft this exercise for
+# social anxiety?", is left to the LLM
+_PLAN_HANDOVER_RE = re.compile(
+    r"^\s*here.?s my plan\s*:|(?:^|[.!?:]\s+)(?:(?:can|could) you\s+|please\s+)?(?:draft|format) this(?: plan)?\s*(?:[:.!?]|$)",
+    re.I,
+)
+_PLAN_STEP_RE = re.compile(r"\bstep\s*\d+|(?:^|\n)\s*\d+[.)]\s", re.I)
+MIN_PLAN_STEPS = 2
+
+GREETING_RESPONSE = "Hello! I'm Cerina, your CBT companion. I can help you create personalized cognitive behavioral therapy exercises. What's on your mind today?"
+THANKS_RESPONSE = "You're welcome! Let me know whenever you'd like to work on another CBT exercise."
+FAREWELL_RESPONSE = "Take care! I'm here whenever you want to create another CBT exercise."
+
+# LLM decisions are reused for repeated queries within this window
+DECISION_CACHE_TTL = 300.0
+DECISION_CACHE_MAX_ENTRIES = 256
+
+
+class RouterDecision(BaseModel):
+    """Structured routing decision returned by the router LLM."""
+    route: Literal["conversation", "planner", "draftsman"] = Field(
+        description="Workflow to route the user's message to"
+    )
+    response: str = Field(
+        description="Direct reply if route is 'conversation', empty string otherwise"
+    )
 
 
 class RouterAgent:
@@ -18,11 +58,18 @@ class RouterAgent:
     """
     
     def __init__(self, model_name: str = "gemini-2.5-flash-lite"):
-        self.llm = ChatGoogleGenerativeAI(
-            model=model_name,
-            temperature=0.3,  # Lower temperature for consistent classification
-            google_api_key=settings.GEMINI_API_KEY
+        self.llm = get_gemini(
+            model_name,
+            0.3,  # Lower temperature for consistent classification
         )
+        # Provider-side JSON mode validated against RouterDecision
+        self.structured_llm = self.llm.with_structured_output(RouterDecision, method="json_mode")
+        # Deterministic retry for the rare malformed decision
+        self.retry_llm = get_gemini(model_name, 0.0).with_structured_output(RouterDecision, method="json_mode")
+        # sha256(user_query) -> (expires_at, routing result). Sessions route
+        # concurrently (sync nodes run on worker threads), so access is locked
+        self._decision_cache: Dict[str, Tuple[float, dict]] = {}
+        self._decision_cache_lock = threading.Lock()
         self.system_prompt = """You are an intelligent routing assistant for a CBT (Cognitive Behavioral Therapy) application called Cerina.
 
             Analyze the user's message and classify their intent into ONE of these categories:
@@ -63,36 +110,66 @@ class RouterAgent:
             User: "Here's my plan: Step 1 - Identify the thought, Step 2 - Challenge it. Can you draft this?"
             {{"route": "draftsman", "response": ""}}
             """
+        
+        # Built once: only the user query changes between turns, so the system
+        # message is rendered here instead of re-formatting a template per call
+        self._system_message = SystemMessagePromptTemplate.from_template(self.system_prompt).format()
+
+    def _fast_route(self, user_query: str):
+        """Route unambiguous messages without an LLM call; None if the LLM is needed."""
+        if _GREETING_RE.match(user_query):
+            return {"route": "conversation", "router_response": GREETING_RESPONSE}
+        if _THANKS_RE.match(user_query):
+            return {"route": "conversation", "router_response": THANKS_RESPONSE}
+        if _FAREWELL_RE.match(user_query):
+            return {"route": "conversation", "router_response": FAREWELL_RESPONSE}
+        if _PLAN_HANDOVER_RE.search(user_query) and len(_PLAN_STEP_RE.findall(user_query)) >= MIN_PLAN_STEPS:
+            return {"route": "draftsman", "router_response": ""}
+        return None
 
     def invoke(self, state: dict) -> dict:
         user_query = state.get('user_query', '')
         
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", self.system_prompt),
-            ("user", "{user_query}")
-        ])
+        fast_result = self._fast_route(user_query)
+        if fast_result is not None:
+            return fast_result
+        
+        cache_key = hashlib.sha256(user_query.encode("utf-8")).hexdigest()
+        with self._decision_cache_lock:
+            cached = self._decision_cache.get(cache_key)
+        if cached is not None and cached[0] > time.monotonic():
+            return dict(cached[1])
         
-        chain = prompt | self.llm | StrOutputParser()
-        response = chain.invoke({"user_query": user_query})
+        messages = [self._system_message, HumanMessage(content=user_query)]
         
-        # Parse JSON response
         try:
-            # Clean response - remove markdown code blocks if present
-            cleaned = response.strip()
-            if cleaned.startswith("```"):
-                cleaned = re.sub(r'^```(?:json)?\s*', '', cleaned)
-                cleaned = re.sub(r'\s*```$', '', cleaned)
-            
-            result = json.loads(cleaned)
-            route = result.get("route", "planner")
-            router_response = result.get("response", "")
-        except (json.JSONDecodeError, AttributeError):
-            # Fallback to planner if parsing fails
-            print(f"Router parsing failed, defaulting to planner. Raw: {response}")
-            route = "planner"
-            router_response = ""
+            decision = self.structured_llm.invoke(messages)
+        except OutputParserException as e:
+            print(f"Router decision invalid, retrying at temperature 0: {e}")
+            try:
+                decision = self.retry_llm.invoke(messages)
+            except OutputParserException as e:
+                print(f"Router retry failed: {e}")
+                decision = None
         
-        return {
-            "route": route,
-            "router_response": router_response
+        if decision is None:
+            # Fallback to planner if no valid decision was produced
+            print("Router produced no decision, defaulting to planner.")
+            return {
+                "route": "planner",
+                "router_response": ""
+            }
+        
+        result = {
+            "route": decision.route,
+            "router_response": decision.response if decision.route == "conversation" else ""
         }
+        
+        # Bounded cache: drop the oldest entry once full (dicts keep insertion order)
+        with self._decision_cache_lock:
+            self._decision_cache.pop(cache_key, None)
+            if len(self._decision_cache) >= DECISION_CACHE_MAX_ENTRIES:
+                self._decision_cache.pop(next(iter(self._decision_cache)))
+            self._decision_cache[cache_key] = (time.monotonic() + DECISION_CACHE_TTL, result)
+        
+        return dict(result)
@@ -7,15 +7,101 @@ with optimal formatting, scannability, and visual presentation.
 
 import json
 import re
+import asyncio
+import functools
 from datetime import datetime
-from typing import Dict, Any
-from langchain_google_genai import ChatGoogleGenerativeAI
+from typing import Dict, Any, List, Optional, Tuple
+
+import orjson
 from langchain_core.messages import SystemMessage, HumanMessage
 
-from backend.settings import settings
-from backend.events import get_emitter
+from backend.llm import get_gemini, run_sync
+from backend.events import EventEmitter, get_emitter
+
+from backend.agents.synthesizer.prompts import (
+    PRESENTATION_SYNTHESIZER_PROMPT,
+    PRESENTATION_SYNTHESIZER_INPUT_PROMPT,
+    STRUCTURE_PROMPT,
+    COMPRESSION_PROMPT,
+    SCAN_PROMPT,
+    POLISH_PROMPT,
+    MERGE_PROMPT,
+    MERGE_INPUT_PROMPT
+)
+from backend.agents.synthesizer.cache import synthesis_cache
+
+
+# A response wrapped entirely in ```markdown ... ``` / ```md ... ``` / ``` ... ```
+_FULL_CODEBLOCK_RE = re.compile(r'^```(?:markdown|md)?\s*\n(.*?)\n```\s*$', re.DOTALL)
+
+# Static system prompts are built into messages once and reused for every call
+_SYNTHESIZER_SYSTEM_MESSAGE = SystemMessage(content=PRESENTATION_SYNTHESIZER_PROMPT)
+_ASPECT_SYSTEM_MESSAGES = tuple(
+    SystemMessage(content=prompt)
+    for prompt in (STRUCTURE_PROMPT, COMPRESSION_PROMPT, SCAN_PROMPT, POLISH_PROMPT)
+)
+_MERGE_SYSTEM_MESSAGE = SystemMessage(content=MERGE_PROMPT)
 
-from backend.agents.synthesizer.prompts import PRESENTATION_SYNTHESIZER_PROMPT
+# Only the draft changes per call; everything before it depends on the plan alone
+_INPUT_HEAD, _INPUT_TAIL = PRESENTATION_SYNTHESIZER_INPUT_PROMPT.split("{draft}")
+
+
+@functools.lru_cache(maxsize=32)
+def _plan_input_prefix(forbidden_content: tuple, required_components: tuple,
+                       exercise_type: str) -> Tuple[str, str]:
+    """
+    Serialize the protocol constraints and format the plan-dependent input prefix.
+    
+    Memoized since the plan is fixed across reflection iterations of a session.
+    Returns (protocol_constraints, input_prefix).
+    """
+    # Compact output: fewer prompt tokens, same meaning to the model
+    protocol_constraints = orjson.dumps({
+        "forbidden_content": list(forbidden_content),
+        "required_components": list(required_components),
+    }).decode()
+    input_prefix = _INPUT_HEAD.format(
+        protocol_constraints=protocol_constraints,
+        exercise_type=exercise_type
+    )
+    return protocol_constraints, input_prefix
+
+
+# event_type -> emitter call, replacing an if/elif chain in _emit
+_EMIT_DISPATCH = {
+    "thought": lambda e, k: e.emit_thought("synthesizer", k.get("content", "")),
+    "thought_chunk": lambda e, k: e.emit_thought_chunk("synthesizer", k.get("content", "")),
+    "message_chunk": lambda e, k: e.emit_message_chunk("synthesizer", k.get("content", "")),
+    "message_end": lambda e, k: e.emit_message_end("synthesizer"),
+    "status": lambda e, k: e.emit_status("synthesizer", k.get("content", "")),
+    "artifact": lambda e, k: e.emit_artifact(
+        "synthesizer",
+        k.get("content", ""),
+        k.get("artifact_type", ""),
+        k.get("title", "")
+    ),
+    "agent_memory": lambda e, k: e.emit_agent_memory(
+        "Presentation Synthesizer",
+        k.get("messages", []),
+        k.get("scratchpad", "")
+    ),
+    "agent_start": lambda e, k: e.emit_agent_start("Presentation Synthesizer", k.get("content", "")),
+}
+
+
+def _strip_partial_fence(stripped: str) -> str:
+    """Drop a lone opening and/or closing fence line from already-stripped content."""
+    if not stripped.startswith('```'):
+        return stripped
+    
+    lines = stripped.split('\n')
+    # Remove first line if it's just the code block opener
+    if lines[0].strip() in ('```', '```markdown', '```md'):
+        lines = lines[1:]
+    # Remove last line if it's just the code block closer
+    if lines and lines[-1].strip() == '```':
+        lines = lines[:-1]
+    return '\n'.join(lines).strip()
 
 
 def extract_markdown_from_codeblock(content: str) -> str:
@@ -28,30 +114,9 @@ def extract_markdown_from_codeblock(content: str) -> str:
     if not content:
         return content
     
-    # Pattern to match ```markdown ... ``` or ```md ... ``` or ``` ... ```
-    patterns = [
-        r'^```(?:markdown|md)?\s*\n(.*?)\n```\s*$',  # Full wrap
-        r'^```(?:markdown|md)?\s*\n(.*)',             # Only opening
-        r'(.*?)\n```\s*$',                            # Only closing
-    ]
-    
-    # Try the full match first
-    full_match = re.match(r'^```(?:markdown|md)?\s*\n(.*?)\n```\s*$', content, re.DOTALL)
-    if full_match:
-        return full_match.group(1).strip()
-    
-    # Check if content starts with code block but doesn't end properly
-    if content.strip().startswith('```'):
-        lines = content.strip().split('\n')
-        # Remove first line if it's just the code block opener
-        if lines[0].strip() in ['```', '```markdown', '```md']:
-            lines = lines[1:]
-        # Remove last line if it's just the code block closer
-        if lines and lines[-1].strip() == '```':
-            lines = lines[:-1]
-        return '\n'.join(lines).strip()
-    
-    return content.strip()
+    stripped = content.strip()
+    full_match = _FULL_CODEBLOCK_RE.match(stripped)
+    return full_match.group(1).strip() if full_match else _strip_partial_fence(stripped)
 
 
 
@@ -71,107 +136,220 @@ class PresentationSynthesizerAgent:
     def __init__(
         self,
         model: str = "gemini-2.5-flash-lite",
-        temperature: float = 0.6
+        temperature: float = 0.6,
+        fan_out: bool = False,
+        aspect_model: str = "gemini-2.5-flash-lite"
     ):
         """
         Initialize the Presentation Synthesizer.
         
         Args:
-            model: LLM model for synthesis
+            model: LLM model for synthesis (and the merge step in fan-out mode)
             temperature: Low temperature for faithful formatting
+            fan_out: Run structure/compression/scannability/polish as parallel
+                     passes merged by a final call, instead of one combined pass
+            aspect_model: Smaller model for the per-aspect passes in fan-out mode
         """
-        self.synthesizer_llm = ChatGoogleGenerativeAI(
-            model=model,
-            temperature=temperature,
-            google_api_key=settings.GEMINI_API_KEY,
-        )
+        self.model = model
+        self.temperature = temperature
+        self.fan_out = fan_out
+        self.synthesizer_llm = get_gemini(model, temperature)
+        self.aspect_llm = get_gemini(aspect_model, 0.2)
     
     # =========================================================================
     # EVENT EMISSION HELPERS
     # =========================================================================
-    def _emit(self, event_type: str, **kwargs):
-        """Emit event if emitter is available."""
-        emitter = get_emitter()
-        if emitter:
-            if event_type == "thought":
-                emitter.emit_thought("synthesizer", kwargs.get("content", ""))
-            elif event_type == "thought_chunk":
-                emitter.emit_thought_chunk("synthesizer", kwargs.get("content", ""))
-            elif event_type == "message_chunk":
-                emitter.emit_message_chunk("synthesizer", kwargs.get("content", ""))
-            elif event_type == "message_end":
-                emitter.emit_message_end("synthesizer")
-            elif event_type == "status":
-                emitter.emit_status("synthesizer", kwargs.get("content", ""))
-            elif event_type == "artifact":
-                emitter.emit_artifact(
-                    "synthesizer",
-                    kwargs.get("content", ""),
-                    kwargs.get("artifact_type", ""),
-                    kwargs.get("title", "")
-                )
-            elif event_type == "agent_memory":
-                emitter.emit_agent_memory(
-                    "Presentation Synthesizer",
-                    kwargs.get("messages", []),
-                    kwargs.get("scratchpad", "")
-                )
-            elif event_type == "agent_start":
-                emitter.emit_agent_start("Presentation Synthesizer", kwargs.get("content", ""))
+    def _emit(self, event_type: str, emitter: Optional[EventEmitter] = None, **kwargs):
+        """
+        Emit event if emitter is available.
+        
+        Callers on the hot path pass the emitter they resolved once per
+        invocation; it is not stored on the agent since one instance serves
+        every session.
+        """
+        if emitter is None:
+            emitter = get_emitter()
+            if emitter is None:
+                return
+        _EMIT_DISPATCH[event_type](emitter, kwargs)
     
     # =========================================================================
     # SYNTHESIS LOGIC
     # =========================================================================
-    def _synthesize(self, draft: str, plan: Dict[str, Any]) -> str:
+    async def _synthesize(
+        self,
+        draft: str,
+        plan: Dict[str, Any],
+        emitter: Optional[EventEmitter] = None,
+        stream: bool = True
+    ) -> str:
         """
         Apply final presentation formatting to the draft.
         
+        Args:
+            draft: Approved draft to format
+            plan: Parsed plan for protocol constraints
+            emitter: Emitter resolved by the caller (None when nobody is listening)
+            stream: Stream tokens to the UI as they arrive; batch mode disables
+                    this, and it is skipped automatically when no emitter is registered
+        
         Returns the synthesized/formatted content.
         """
+        stream = stream and emitter is not None
+        
         exercise_type = plan.get("exercise_type", "CBT Exercise")
         
-        # Extract protocol constraints
-        protocol_constraints = json.dumps({
-            "forbidden_content": plan.get("safety_envelope", {}).get("forbidden_content", []),
-            "required_components": plan.get("drafting_spec", {}).get("required_fields", []),
-        }, indent=2)
+        # Extract protocol constraints (cached per plan)
+        protocol_constraints, input_prefix = _plan_input_prefix(
+            tuple(plan.get("safety_envelope", {}).get("forbidden_content", [])),
+            tuple(plan.get("drafting_spec", {}).get("required_fields", [])),
+            exercise_type
+        )
         
-        formatted_prompt = PRESENTATION_SYNTHESIZER_PROMPT.format(
-            protocol_constraints=protocol_constraints,
-            draft=draft,
-            exercise_type=exercise_type
+        # Identical approved drafts (e.g. re-approval, regeneration) reuse the prior result
+        cache_key = synthesis_cache.make_key(
+            draft, protocol_constraints, exercise_type,
+            f"{self.model}:fan_out" if self.fan_out else self.model, self.temperature
         )
+        cached = synthesis_cache.get(cache_key)
+        if cached is not None:
+            if stream:
+                self._emit("message_chunk", emitter, content=cached)
+                self._emit("message_end", emitter)
+            return cached
+        
+        # Per-call inputs go in the human message so the system prompt stays a cacheable prefix
+        synthesis_input = "".join((input_prefix, draft, _INPUT_TAIL))
         
-        # Stream the synthesis for real-time visibility
-        accumulated_content = ""
+        if self.fan_out:
+            # Aspect passes run concurrently; only the merge is streamed
+            synthesis_messages = await self._fan_out_messages(draft, synthesis_input, emitter)
+        else:
+            synthesis_messages = [
+                _SYNTHESIZER_SYSTEM_MESSAGE,
+                HumanMessage(content=synthesis_input)
+            ]
         
-        for chunk in self.synthesizer_llm.stream([
-            SystemMessage(content=formatted_prompt),
-            HumanMessage(content="Reformat this draft for optimal patient presentation. Output only the formatted Markdown.")
-        ]):
-            if hasattr(chunk, 'content') and chunk.content:
-                content = chunk.content if isinstance(chunk.content, str) else str(chunk.content)
-                accumulated_content += content
+        if stream:
+            # Forward tokens as they arrive so the UI sees first-token latency
+            parts = []
+            async for chunk in self.synthesizer_llm.astream(synthesis_messages):
+                chunk_content = getattr(chunk, 'content', None)
+                if chunk_content:
+                    chunk_content = chunk_content if isinstance(chunk_content, str) else str(chunk_content)
+                    parts.append(chunk_content)
+                    self._emit("message_chunk", emitter, content=chunk_content)
+            self._emit("message_end", emitter)  # Final presentation is persisted via the artifact event
+            content = "".join(parts)
+        else:
+            # Nobody is listening (batch mode, tests, no websocket): single round-trip
+            response = await self.synthesizer_llm.ainvoke(synthesis_messages)
+            content = response.content if isinstance(response.content, str) else str(response.content)
         
-        return accumulated_content if accumulated_content else draft
+        if not content:
+            return draft
+        
+        synthesis_cache.set(cache_key, content)
+        return content
+    
+    async def _fan_out_messages(
+        self,
+        draft: str,
+        synthesis_input: str,
+        emitter: Optional[EventEmitter] = None
+    ) -> list:
+        """
+        Run the four formatting aspects in parallel and build the merge request.
+        
+        Wall-clock is the slowest aspect pass plus the merge, rather than one
+        pass doing all four aspects. A failed or empty aspect falls back to the
+        original draft so the merge still sees every section.
+        """
+        self._emit("thought", emitter, content="Running structure, compression, scannability and polish passes in parallel...")
+        
+        # One human message shared by all four aspect passes
+        aspect_input = HumanMessage(content=synthesis_input)
+        
+        async def _aspect(system_message: SystemMessage) -> str:
+            response = await self.aspect_llm.ainvoke([system_message, aspect_input])
+            content = response.content if isinstance(response.content, str) else str(response.content)
+            return content or draft
+        
+        results = await asyncio.gather(
+            *(_aspect(system_message) for system_message in _ASPECT_SYSTEM_MESSAGES),
+            return_exceptions=True
+        )
+        structure, compression, scannability, polish = (
+            draft if isinstance(result, BaseException) else result for result in results
+        )
+        
+        merge_input = MERGE_INPUT_PROMPT.format(
+            draft=draft,
+            structure=structure,
+            compression=compression,
+            scannability=scannability,
+            polish=polish
+        )
+        return [
+            _MERGE_SYSTEM_MESSAGE,
+            HumanMessage(content=merge_input)
+        ]
     
     # =========================================================================
     # PUBLIC INTERFACE
     # =========================================================================
     def invoke(self, state: dict) -> dict:
+        """
+        Synchronous wrapper around ainvoke() for scripts without an event loop.
+        
+        Raises RuntimeError inside a running loop (the graph awaits ainvoke()).
+        """
+        return run_sync(self.ainvoke(state))
+    
+    def invoke_batch(self, states: List[dict], max_concurrency: int = 10) -> List[dict]:
+        """Synchronous wrapper around ainvoke_batch() (scripts only, like invoke())."""
+        return run_sync(self.ainvoke_batch(states, max_concurrency))
+    
+    async def ainvoke_batch(self, states: List[dict], max_concurrency: int = 10) -> List[dict]:
+        """
+        Synthesize several approved drafts concurrently (e.g. regenerating a suite).
+        
+        Streaming is disabled and at most max_concurrency Gemini calls are
+        in flight at once.
+        
+        Args:
+            states: Input states, each shaped like the one passed to invoke()
+            max_concurrency: Maximum number of concurrent syntheses
+            
+        Returns:
+            Results in the same order as states
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def _bounded(state: dict) -> dict:
+            async with semaphore:
+                return await self.ainvoke(state, stream=False)
+        
+        return await asyncio.gather(*(_bounded(state) for state in states))
+    
+    async def ainvoke(self, state: dict, stream: bool = True) -> dict:
         """
         Execute the presentation synthesis.
         
         Args:
             state: Input state with 'current_draft' (approved), 'plan'
+            stream: Stream the synthesis to the UI (disabled in batch mode)
             
         Returns:
             dict with 'final_presentation', 'draft' (final)
         """
+        # Resolved once for the whole invocation
+        emitter = get_emitter()
+        
         # Emit agent_start event first
-        self._emit("agent_start", content="Draft approved! Applying final presentation formatting...")
+        self._emit("agent_start", emitter, content="Draft approved! Applying final presentation formatting...")
         
-        self._emit("thought", content="Applying final formatting: structure optimization, compression, scannability polish...")
+        self._emit("thought", emitter, content="Applying final formatting: structure optimization, compression, scannability polish...")
         
         # Get the approved draft
         current_draft = state.get("current_draft") or state.get("draft", "")
@@ -180,14 +358,14 @@ class PresentationSynthesizerAgent:
         
         # Parse plan if string
         try:
-            plan = json.loads(plan_str) if isinstance(plan_str, str) else plan_str
-        except json.JSONDecodeError:
+            plan = orjson.loads(plan_str) if isinstance(plan_str, str) else plan_str
+        except orjson.JSONDecodeError:
             plan = {}
         
         exercise_type = plan.get("exercise_type", "CBT Exercise")
         
         # Perform synthesis
-        final_presentation = self._synthesize(current_draft, plan)
+        final_presentation = await self._synthesize(current_draft, plan, emitter, stream=stream)
         
         # Create final version entry
         final_version = {
@@ -199,48 +377,49 @@ class PresentationSynthesizerAgent:
             "changes": "Final presentation formatting applied"
         }
         
-        updated_versions = list(draft_versions) + [final_version]
+        updated_versions = [*draft_versions, final_version]
         
-        # Emit completion message
-        self._emit("message_chunk", content=f"✅ **Final Presentation Ready**\n\nYour {exercise_type} has been synthesized and is ready for use.")
-        self._emit("message_end")
-        
-        # Emit final message for persistence to ChatHistory
-        self._emit("message", content=final_presentation)
-
         # Emit the final artifact
         self._emit(
             "artifact",
+            emitter,
             content=final_presentation,
             artifact_type="cbt_exercise",
             title=f"CBT Exercise: {exercise_type}"
         )
         
+        input_len = len(current_draft)
+        output_len = len(final_presentation)
+        version = final_version["version"]
+        
         # Build messages for Memory popup
         memory_messages = [
             {"type": "SystemMessage", "content": "Presentation Synthesizer Prompt - Apply final formatting and polish"},
-            {"type": "HumanMessage", "content": f"Draft to synthesize: {exercise_type}\nDraft length: {len(current_draft)} characters"},
-            {"type": "AIMessage", "content": f"Synthesis complete. Created final version v{final_version['version']}.\n\nApplied formatting:\n- Structure optimization\n- Scannability polish\n- Patient-ready presentation"}
+            {"type": "HumanMessage", "content": f"Draft to synthesize: {exercise_type}\nDraft length: {input_len} characters"},
+            {"type": "AIMessage", "content": f"Synthesis complete. Created final version v{version}.\n\nApplied formatting:\n- Structure optimization\n- Scannability polish\n- Patient-ready presentation"}
         ]
         
         # Build scratchpad for Memory popup
-        scratchpad = f"# Presentation Synthesizer - Final Pass\n\n"
-        scratchpad += f"## Exercise Type\n{exercise_type}\n\n"
-        scratchpad += f"## Processing\n"
-        scratchpad += f"- Input draft length: {len(current_draft)} characters\n"
-        scratchpad += f"- Output length: {len(final_presentation)} characters\n"
-        scratchpad += f"- Compression ratio: {len(final_presentation)/max(len(current_draft), 1):.1%}\n\n"
-        scratchpad += f"## Formatting Applied\n"
-        scratchpad += f"- Structure optimization\n"
-        scratchpad += f"- Compression\n"
-        scratchpad += f"- Scannability polish\n"
-        scratchpad += f"- Patient-ready formatting\n\n"
-        scratchpad += f"## Version Created\n"
-        scratchpad += f"- Version: v{final_version['version']}.0 (Final)\n"
+        scratchpad = (
+            f"# Presentation Synthesizer - Final Pass\n\n"
+            f"## Exercise Type\n{exercise_type}\n\n"
+            f"## Processing\n"
+            f"- Input draft length: {input_len} characters\n"
+            f"- Output length: {output_len} characters\n"
+            f"- Compression ratio: {output_len / max(input_len, 1):.1%}\n\n"
+            f"## Formatting Applied\n"
+            f"- Structure optimization\n"
+            f"- Compression\n"
+            f"- Scannability polish\n"
+            f"- Patient-ready formatting\n\n"
+            f"## Version Created\n"
+            f"- Version: v{version}.0 (Final)\n"
+        )
         
         # Emit agent memory with messages
         self._emit(
             "agent_memory",
+            emitter,
             messages=memory_messages,
             scratchpad=scratchpad
         )
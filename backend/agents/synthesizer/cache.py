@@ -0,0 +1,79 @@
+"""
+Synthesis Cache - Exact-match response cache for the Presentation Synthesizer.
+
+An approved draft that is byte-identical to one already synthesized under the
+same constraints and model settings reuses the earlier presentation instead of
+paying for another Gemini round-trip.
+"""
+
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class SynthesisCache:
+    """
+    In-process LRU cache with per-entry TTL.
+
+    Keys are digests of every input that shapes the synthesis output, so a
+    hit is always safe to return verbatim.
+    """
+
+    def __init__(self, max_entries: int = 128, ttl: float = 3600.0):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached presentations
+            ttl: Seconds an entry stays valid
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(
+        draft: str,
+        protocol_constraints: str,
+        exercise_type: str,
+        model: str,
+        temperature: float
+    ) -> str:
+        """Digest all synthesis inputs into a cache key."""
+        digest = hashlib.sha256()
+        for part in (draft, protocol_constraints, exercise_type, model, repr(temperature)):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")  # Separator so field boundaries can't collide
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached presentation, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        """Store a presentation, evicting the least recently used entry if full."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached presentations."""
+        self._entries.clear()
+
+
+# Process-wide cache shared by all synthesizer instances
+synthesis_cache = SynthesisCache()
@@ -38,14 +38,113 @@ You are purely FORMATTING and POLISHING.
 ⚠️ DO NOT change the meaning of instructions
 ⚠️ DO NOT violate protocol constraints
 
-## Protocol Constraints
+## Your Task
+The protocol constraints, exercise type and draft to reformat are provided in the next message.
+
+Output clean, well-formatted Markdown ready for patient use. 
+The result should feel professional, warm, and easy to follow."""
+
+
+PRESENTATION_SYNTHESIZER_INPUT_PROMPT = """## Protocol Constraints
 {protocol_constraints}
 
+## Exercise Type
+{exercise_type}
+
 ## Draft to Reformat
 {draft}
 
-## Exercise Type
-{exercise_type}
+Reformat this draft for optimal patient presentation. Output only the formatted Markdown."""
+
+
+# =============================================================================
+# FAN-OUT MODE - One focused pass per formatting aspect, then a merge
+# =============================================================================
+_ASPECT_CONSTRAINTS = """## Critical Constraints
+⚠️ DO NOT add new therapeutic content
+⚠️ DO NOT remove any clinical elements
+⚠️ DO NOT change the meaning of instructions
+⚠️ DO NOT violate protocol constraints
+
+The protocol constraints, exercise type and draft to reformat are provided in the next message.
+Output only the reformatted Markdown."""
+
+
+STRUCTURE_PROMPT = """You are a STRUCTURE EDITOR for therapeutic CBT exercises.
+Improve ONLY the document structure of an approved draft:
+- Ensure clear heading hierarchy (H1 → H2 → H3)
+- Add visual breaks between major sections
+- Group related content logically
+
+Leave wording, length and inline formatting otherwise unchanged.
+
+""" + _ASPECT_CONSTRAINTS
+
+
+COMPRESSION_PROMPT = """You are a COMPRESSION EDITOR for therapeutic CBT exercises.
+Improve ONLY the concision of an approved draft:
+- Merge repetitive instructions into single blocks
+- Convert verbose step sequences into tables where appropriate
+- Remove redundant phrases while preserving meaning
+
+Leave the section structure otherwise unchanged.
+
+""" + _ASPECT_CONSTRAINTS
+
+
+SCAN_PROMPT = """You are a SCANNABILITY EDITOR for therapeutic CBT exercises.
+Improve ONLY how easily an approved draft can be skimmed:
+- Add bullet points for lists
+- Bold key terms and action items
+- Use numbered lists for sequential steps
+- Add emoji sparingly for visual anchoring (📝, ✓, 💡)
+
+Leave wording and section structure otherwise unchanged.
+
+""" + _ASPECT_CONSTRAINTS
+
+
+POLISH_PROMPT = """You are a COPY EDITOR for therapeutic CBT exercises.
+Improve ONLY the polish of an approved draft:
+- Fix any grammatical issues
+- Ensure consistent formatting throughout
+- Add appropriate whitespace for readability
+
+Leave structure and content otherwise unchanged.
+
+""" + _ASPECT_CONSTRAINTS
+
+
+MERGE_PROMPT = """You are a PRESENTATION SYNTHESIZER for therapeutic CBT exercises.
+
+You receive an approved draft and four edited versions of it, each improving one aspect:
+structure, compression, scannability and polish.
+Combine the improvements of all four into a single patient-ready document.
+
+## Critical Constraints
+⚠️ The ORIGINAL DRAFT is the source of truth for clinical content
+⚠️ DO NOT add new therapeutic content
+⚠️ DO NOT remove any clinical elements
+⚠️ DO NOT change the meaning of instructions
+⚠️ DO NOT violate protocol constraints
 
 Output clean, well-formatted Markdown ready for patient use. 
 The result should feel professional, warm, and easy to follow."""
+
+
+MERGE_INPUT_PROMPT = """## Original Draft
+{draft}
+
+## Structure Edit
+{structure}
+
+## Compression Edit
+{compression}
+
+## Scannability Edit
+{scannability}
+
+## Polish Edit
+{polish}
+
+Merge these edits now. Output only the formatted Markdown."""
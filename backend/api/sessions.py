@@ -6,18 +6,30 @@ All endpoints require authentication and filter by user_id.
 """
 
 from datetime import datetime
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional, Tuple
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import update, func, lambda_stmt, bindparam, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 from pydantic import BaseModel
 
 from backend.database import get_session
 from backend.models import Session, Message, Artifact, WorkflowRun, AgentEvent, AgentMemory, ChatHistoryItem
-import json
 
 
-router = APIRouter(prefix="/api/sessions", tags=["sessions"])
+# orjson serializes the (potentially large) list responses much faster than stdlib json
+router = APIRouter(prefix="/api/sessions", tags=["sessions"], default_response_class=ORJSONResponse)
+
+
+# Database-side UTC timestamp; columns store naive UTC like datetime.utcnow()
+_UTC_NOW = func.timezone("utc", func.now())
+
+# Keyset pagination: largest page a client may request, and the response header
+# carrying the cursor of the next page (absent on the last page)
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
 
 
 # --- Pydantic Schemas ---
@@ -157,14 +169,118 @@ class ChatHistoryItemResponse(BaseModel):
 
 from fastapi import Header
 
-def get_current_user_id(user_id: str = Header(..., alias="user-id", description="Firebase User UID")) -> str:
+async def get_current_user_id(user_id: str = Header(..., alias="user-id", description="Firebase User UID")) -> str:
     """
     Temporary: Returns the user ID passed in the header.
     In production, this should verify the Firebase JWT token from Authorization header.
+    
+    Declared async since it never blocks: FastAPI then calls it directly on the
+    event loop instead of dispatching it to the threadpool.
     """
     return user_id
 
 
+# --- Ownership Helpers ---
+
+# Cached statements: compiled once, then reused with new bound parameters
+_session_owner_stmt = lambda_stmt(
+    lambda: select(Session.id)
+    .where(Session.id == bindparam("sid"))
+    .where(Session.user_id == bindparam("uid"))
+)
+_session_by_owner_stmt = lambda_stmt(
+    lambda: select(Session)
+    .where(Session.id == bindparam("sid"))
+    .where(Session.user_id == bindparam("uid"))
+)
+# One row iff the session is the user's; run_id is NULL unless the run is in it
+_workflow_run_owner_stmt = lambda_stmt(
+    lambda: select(Session.id, WorkflowRun.id.label("run_id"))
+    .select_from(Session)
+    .outerjoin(
+        WorkflowRun,
+        (WorkflowRun.session_id == Session.id) & (WorkflowRun.id == bindparam("rid"))
+    )
+    .where(Session.id == bindparam("sid"))
+    .where(Session.user_id == bindparam("uid"))
+)
+
+
+async def ensure_session_owned(db: AsyncSession, session_id: str, user_id: str) -> None:
+    """
+    Raise 404 unless the session exists and belongs to the user.
+    
+    List endpoints fold the ownership predicate into their main query and only
+    call this when it returns no rows, to tell "not yours" apart from "empty".
+    """
+    result = await db.execute(_session_owner_stmt, {"sid": session_id, "uid": user_id})
+    if result.first() is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+
+async def ensure_workflow_run_owned(db: AsyncSession, session_id: str, workflow_run_id: str, user_id: str) -> None:
+    """
+    Raise 404 unless the session is the user's and the workflow run belongs to it.
+    
+    Both checks run as a single query; the outer join tells the two 404s apart.
+    """
+    result = await db.execute(
+        _workflow_run_owner_stmt, {"rid": workflow_run_id, "sid": session_id, "uid": user_id}
+    )
+    row = result.first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if row.run_id is None:
+        raise HTTPException(status_code=404, detail="Workflow run not found")
+
+
+# --- Pagination Helpers ---
+
+def encode_keyset_cursor(created_at: datetime, row_id: str) -> str:
+    """Build the opaque cursor for a (created_at, id) keyset position."""
+    return f"{created_at.isoformat()}|{row_id}"
+
+
+def decode_keyset_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Parse a cursor from encode_keyset_cursor, raising 400 if malformed."""
+    try:
+        created_at, row_id = cursor.split("|", 1)
+        return datetime.fromisoformat(created_at), row_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def apply_keyset_page(stmt, created_at_col, id_col, after: Optional[str], limit: Optional[int], descending: bool = False):
+    """
+    Order a list query by (created_at, id) and restrict it to one page.
+    
+    Pages resume strictly after the cursor position, so each page is an index
+    range scan rather than an OFFSET that re-reads every earlier row. One row
+    beyond the limit is fetched to tell whether another page exists.
+    """
+    if descending:
+        stmt = stmt.order_by(created_at_col.desc(), id_col.desc())
+    else:
+        stmt = stmt.order_by(created_at_col.asc(), id_col.asc())
+    
+    if after is not None:
+        position = tuple_(created_at_col, id_col)
+        boundary = tuple_(*decode_keyset_cursor(after))
+        stmt = stmt.where(position < boundary if descending else position > boundary)
+    
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+    return stmt
+
+
+def split_keyset_page(rows: list, limit: Optional[int]) -> Tuple[list, Optional[str]]:
+    """Drop the look-ahead row of a page and return (rows, next cursor or None)."""
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_keyset_cursor(rows[-1].created_at, rows[-1].id)
+
+
 # --- Endpoints ---
 
 @router.get("", response_model=List[SessionResponse])
@@ -173,13 +289,21 @@ async def list_sessions(
     user_id: str = Depends(get_current_user_id)
 ):
     """List all sessions for the current user."""
+    # Plain column rows: no ORM identity map / instance state for read-only data
     result = await db.execute(
-        select(Session)
+        select(
+            Session.id,
+            Session.user_id,
+            Session.title,
+            Session.created_at,
+            Session.updated_at,
+            Session.is_active
+        )
         .where(Session.user_id == user_id)
         .where(Session.is_active == True)
         .order_by(Session.updated_at.desc())
     )
-    return result.scalars().all()
+    return [SessionResponse.model_construct(**row._mapping) for row in result.all()]
 
 
 @router.post("", response_model=SessionResponse)
@@ -195,7 +319,8 @@ async def create_session(
     )
     db.add(session)
     await db.commit()
-    await db.refresh(session)
+    # No refresh: every column (id, timestamps included) is generated in Python
+    # and stays loaded since the session factory uses expire_on_commit=False
     return session
 
 
@@ -206,11 +331,7 @@ async def get_session_by_id(
     user_id: str = Depends(get_current_user_id)
 ):
     """Get a specific session by ID."""
-    result = await db.execute(
-        select(Session)
-        .where(Session.id == session_id)
-        .where(Session.user_id == user_id)
-    )
+    result = await db.execute(_session_by_owner_stmt, {"sid": session_id, "uid": user_id})
     session = result.scalar_one_or_none()
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -225,23 +346,25 @@ async def update_session(
     user_id: str = Depends(get_current_user_id)
 ):
     """Update a session (e.g., rename title)."""
+    values = {"updated_at": _UTC_NOW}
+    if body.title is not None:
+        values["title"] = body.title
+    if body.is_active is not None:
+        values["is_active"] = body.is_active
+    
+    # Single UPDATE ... RETURNING instead of SELECT then UPDATE
     result = await db.execute(
-        select(Session)
+        update(Session)
         .where(Session.id == session_id)
         .where(Session.user_id == user_id)
+        .values(**values)
+        .returning(Session)
     )
     session = result.scalar_one_or_none()
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    if body.title is not None:
-        session.title = body.title
-    if body.is_active is not None:
-        session.is_active = body.is_active
-    session.updated_at = datetime.utcnow()
-    
     await db.commit()
-    await db.refresh(session)
     return session
 
 
@@ -252,17 +375,17 @@ async def delete_session(
     user_id: str = Depends(get_current_user_id)
 ):
     """Soft delete a session (set is_active=False)."""
+    # Single UPDATE ... RETURNING instead of SELECT then UPDATE
     result = await db.execute(
-        select(Session)
+        update(Session)
         .where(Session.id == session_id)
         .where(Session.user_id == user_id)
+        .values(is_active=False, updated_at=_UTC_NOW)
+        .returning(Session.id)
     )
-    session = result.scalar_one_or_none()
-    if not session:
+    if result.first() is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    session.is_active = False
-    session.updated_at = datetime.utcnow()
     await db.commit()
     
     return {"message": "Session deleted"}
@@ -271,51 +394,85 @@ async def delete_session(
 @router.get("/{session_id}/messages", response_model=List[MessageResponse])
 async def get_session_messages(
     session_id: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
     db: AsyncSession = Depends(get_session),
     user_id: str = Depends(get_current_user_id)
 ):
-    """Get all messages for a session."""
-    # First verify session belongs to user
-    result = await db.execute(
-        select(Session)
+    """
+    Get all messages for a session.
+    
+    Pass `limit` to page the result; `after` takes the X-Next-Cursor header
+    of the previous page.
+    """
+    # Ownership is checked in the same query; plain column rows, no ORM hydration
+    stmt = (
+        select(
+            Message.id,
+            Message.session_id,
+            Message.role,
+            Message.content,
+            Message.created_at
+        )
+        .join(Session, Session.id == Message.session_id)
         .where(Session.id == session_id)
         .where(Session.user_id == user_id)
     )
-    if not result.scalar_one_or_none():
-        raise HTTPException(status_code=404, detail="Session not found")
+    result = await db.execute(apply_keyset_page(stmt, Message.created_at, Message.id, after, limit))
+    rows, next_cursor = split_keyset_page(result.all(), limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     
-    # Get messages
-    result = await db.execute(
-        select(Message)
-        .where(Message.session_id == session_id)
-        .order_by(Message.created_at.asc())
-    )
-    return result.scalars().all()
+    messages = [MessageResponse.model_construct(**row._mapping) for row in rows]
+    if not messages:
+        await ensure_session_owned(db, session_id, user_id)
+    return messages
 
 
 @router.get("/{session_id}/artifacts", response_model=List[ArtifactResponse])
 async def get_session_artifacts(
     session_id: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
     db: AsyncSession = Depends(get_session),
     user_id: str = Depends(get_current_user_id)
 ):
-    """Get all artifacts for a session."""
-    # First verify session belongs to user
-    result = await db.execute(
-        select(Session)
+    """
+    Get all artifacts for a session (newest first).
+    
+    Pass `limit` to page the result; `after` takes the X-Next-Cursor header
+    of the previous page.
+    """
+    # Ownership is checked in the same query; plain column rows, no ORM hydration
+    stmt = (
+        select(
+            Artifact.id,
+            Artifact.session_id,
+            Artifact.agent_name,
+            Artifact.artifact_type,
+            Artifact.title,
+            Artifact.content,
+            Artifact.version,
+            Artifact.iteration,
+            Artifact.created_at
+        )
+        .join(Session, Session.id == Artifact.session_id)
         .where(Session.id == session_id)
         .where(Session.user_id == user_id)
     )
-    if not result.scalar_one_or_none():
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Get artifacts
     result = await db.execute(
-        select(Artifact)
-        .where(Artifact.session_id == session_id)
-        .order_by(Artifact.created_at.desc())
+        apply_keyset_page(stmt, Artifact.created_at, Artifact.id, after, limit, descending=True)
     )
-    return result.scalars().all()
+    rows, next_cursor = split_keyset_page(result.all(), limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    
+    artifacts = [ArtifactResponse.model_construct(**row._mapping) for row in rows]
+    if not artifacts:
+        await ensure_session_owned(db, session_id, user_id)
+    return artifacts
 
 
 @router.get("/{session_id}/workflow-runs", response_model=List[WorkflowRunResponse])
@@ -325,22 +482,18 @@ async def get_session_workflow_runs(
     user_id: str = Depends(get_current_user_id)
 ):
     """Get all workflow runs for a session."""
-    # First verify session belongs to user
+    # Ownership is checked in the same query
     result = await db.execute(
-        select(Session)
+        select(WorkflowRun)
+        .join(Session, Session.id == WorkflowRun.session_id)
         .where(Session.id == session_id)
         .where(Session.user_id == user_id)
-    )
-    if not result.scalar_one_or_none():
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Get workflow runs
-    result = await db.execute(
-        select(WorkflowRun)
-        .where(WorkflowRun.session_id == session_id)
         .order_by(WorkflowRun.started_at.desc())
     )
-    return result.scalars().all()
+    runs = result.scalars().all()
+    if not runs:
+        await ensure_session_owned(db, session_id, user_id)
+    return runs
 
 
 @router.get("/{session_id}/workflow-runs/{workflow_run_id}/events", response_model=List[AgentEventResponse])
@@ -351,31 +504,20 @@ async def get_workflow_run_events(
     user_id: str = Depends(get_current_user_id)
 ):
     """Get all agent events for a specific workflow run."""
-    # First verify session belongs to user
+    # Session and workflow-run ownership are checked in the same query
     result = await db.execute(
-        select(Session)
+        select(AgentEvent)
+        .join(WorkflowRun, WorkflowRun.id == AgentEvent.workflow_run_id)
+        .join(Session, Session.id == WorkflowRun.session_id)
+        .where(WorkflowRun.id == workflow_run_id)
         .where(Session.id == session_id)
         .where(Session.user_id == user_id)
-    )
-    if not result.scalar_one_or_none():
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Verify workflow run belongs to session
-    result = await db.execute(
-        select(WorkflowRun)
-        .where(WorkflowRun.id == workflow_run_id)
-        .where(WorkflowRun.session_id == session_id)
-    )
-    if not result.scalar_one_or_none():
-        raise HTTPException(status_code=404, detail="Workflow run not found")
-    
-    # Get events
-    result = await db.execute(
-        select(AgentEvent)
-        .where(AgentEvent.workflow_run_id == workflow_run_id)
         .order_by(AgentEvent.created_at.asc())
     )
-    return result.scalars().all()
+    events = result.scalars().all()
+    if not events:
+        await ensure_workflow_run_owned(db, session_id, workflow_run_id, user_id)
+    return events
 
 
 @router.get("/{session_id}/workflow-runs/{workflow_run_id}/memories", response_model=List[AgentMemoryResponse])
@@ -386,71 +528,72 @@ async def get_workflow_run_memories(
     user_id: str = Depends(get_current_user_id)
 ):
     """Get all agent memory snapshots for a specific workflow run."""
-    # First verify session belongs to user
+    # Session and workflow-run ownership are checked in the same query
     result = await db.execute(
-        select(Session)
+        select(AgentMemory)
+        .join(WorkflowRun, WorkflowRun.id == AgentMemory.workflow_run_id)
+        .join(Session, Session.id == WorkflowRun.session_id)
+        .where(WorkflowRun.id == workflow_run_id)
         .where(Session.id == session_id)
         .where(Session.user_id == user_id)
-    )
-    if not result.scalar_one_or_none():
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Verify workflow run belongs to session
-    result = await db.execute(
-        select(WorkflowRun)
-        .where(WorkflowRun.id == workflow_run_id)
-        .where(WorkflowRun.session_id == session_id)
-    )
-    if not result.scalar_one_or_none():
-        raise HTTPException(status_code=404, detail="Workflow run not found")
-    
-    # Get memories
-    result = await db.execute(
-        select(AgentMemory)
-        .where(AgentMemory.workflow_run_id == workflow_run_id)
         .order_by(AgentMemory.created_at.asc())
     )
-    return result.scalars().all()
+    memories = result.scalars().all()
+    if not memories:
+        await ensure_workflow_run_owned(db, session_id, workflow_run_id, user_id)
+    return memories
 
 
 @router.get("/{session_id}/events", response_model=List[AgentEventResponse])
 async def get_session_events(
     session_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
     db: AsyncSession = Depends(get_session),
     user_id: str = Depends(get_current_user_id)
 ):
-    """Get all agent events for a session (across all workflow runs)."""
-    # First verify session belongs to user
-    result = await db.execute(
-        select(Session)
+    """
+    Get all agent events for a session (across all workflow runs).
+    
+    Pass `limit` to page the result; `after` takes the X-Next-Cursor header
+    of the previous page.
+    
+    Hot read path: rows are serialized straight to JSON by orjson, bypassing
+    FastAPI's response-model encoding (response_model documents the shape).
+    """
+    # Events of every run in the session, with ownership checked in the same query
+    stmt = (
+        select(
+            AgentEvent.id,
+            AgentEvent.workflow_run_id,
+            AgentEvent.agent_name,
+            AgentEvent.event_type,
+            AgentEvent.content,
+            AgentEvent.tool_name,
+            AgentEvent.tool_args_json,
+            AgentEvent.tool_output,
+            AgentEvent.created_at
+        )
+        .join(WorkflowRun, WorkflowRun.id == AgentEvent.workflow_run_id)
+        .join(Session, Session.id == WorkflowRun.session_id)
         .where(Session.id == session_id)
         .where(Session.user_id == user_id)
     )
-    if not result.scalar_one_or_none():
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Get all workflow run IDs for this session
-    runs_result = await db.execute(
-        select(WorkflowRun.id)
-        .where(WorkflowRun.session_id == session_id)
-    )
-    run_ids = [r[0] for r in runs_result.fetchall()]
-    
-    if not run_ids:
-        return []
+    result = await db.execute(apply_keyset_page(stmt, AgentEvent.created_at, AgentEvent.id, after, limit))
+    rows, next_cursor = split_keyset_page(result.all(), limit)
     
-    # Get all events for these workflow runs
-    result = await db.execute(
-        select(AgentEvent)
-        .where(AgentEvent.workflow_run_id.in_(run_ids))
-        .order_by(AgentEvent.created_at.asc())
-    )
-    return result.scalars().all()
+    events = [dict(row._mapping) for row in rows]
+    if not events:
+        await ensure_session_owned(db, session_id, user_id)
+    return ORJSONResponse(events, headers={NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
 
 
 @router.get("/{session_id}/chat-history", response_model=List[ChatHistoryItemResponse])
 async def get_chat_history(
     session_id: str,
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after_sequence: Optional[int] = None,
     db: AsyncSession = Depends(get_session),
     user_id: str = Depends(get_current_user_id)
 ):
@@ -464,46 +607,77 @@ async def get_chat_history(
     - No complex reconstruction needed
     - Ordering is guaranteed by sequence number
     - All event types (messages, thoughts, tools, artifacts) in one response
+    
+    Long sessions can be loaded in pages: pass `limit`, then resume with
+    `after_sequence` set to the X-Next-Cursor header of the previous page.
+    
+    Chat history is append-only, so (max sequence, row count) identifies its
+    state: refreshes with a matching If-None-Match get 304 without the full read.
+    Otherwise rows are serialized straight to JSON by orjson, bypassing
+    FastAPI's response-model encoding (response_model documents the shape).
     """
-    # First verify session belongs to user
-    result = await db.execute(
-        select(Session)
+    version_result = await db.execute(
+        select(func.max(ChatHistoryItem.sequence), func.count())
+        .select_from(ChatHistoryItem)
+        .join(Session, Session.id == ChatHistoryItem.session_id)
         .where(Session.id == session_id)
         .where(Session.user_id == user_id)
     )
-    if not result.scalar_one_or_none():
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Get chat history ordered by sequence
-    result = await db.execute(
+    max_sequence, item_count = version_result.one()
+    if not item_count:
+        await ensure_session_owned(db, session_id, user_id)
+    
+    # The page window is part of the representation, so it is part of the tag
+    etag = f'"{max_sequence or 0}-{item_count}-{after_sequence}-{limit}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    # Get chat history ordered by sequence (ownership is checked in the same query).
+    # Rows are streamed from the cursor in batches instead of being fully
+    # materialized as ORM objects before the response list is built.
+    stmt = (
         select(ChatHistoryItem)
-        .where(ChatHistoryItem.session_id == session_id)
+        .join(Session, Session.id == ChatHistoryItem.session_id)
+        .where(Session.id == session_id)
+        .where(Session.user_id == user_id)
         .order_by(ChatHistoryItem.sequence.asc())
+        .execution_options(yield_per=200)
     )
-    items = result.scalars().all()
-    
-    # Transform for response (parse JSON fields)
-    response = []
-    for item in items:
-        response.append(ChatHistoryItemResponse(
-            id=item.id,
-            sequence=item.sequence,
-            item_type=item.item_type,
-            role=item.role,
-            content=item.content,
-            agent_name=item.agent_name,
-            tool_name=item.tool_name,
-            tool_args=json.loads(item.tool_args_json) if item.tool_args_json else None,
-            tool_output=item.tool_output,
-            tool_status=item.tool_status,
-            artifact_type=item.artifact_type,
-            artifact_title=item.artifact_title,
-            iteration=item.iteration,
-            version=item.version,
-            created_at=item.created_at
-        ))
-    
-    return response
+    if after_sequence is not None:
+        stmt = stmt.where(ChatHistoryItem.sequence > after_sequence)
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)  # One extra row tells whether another page exists
+    result = await db.stream_scalars(stmt)
+    
+    # Transform for response (parse JSON fields); rows come from the DB with
+    # trusted types, so plain dicts are built without any Pydantic pass
+    items = [
+        {
+            "id": item.id,
+            "sequence": item.sequence,
+            "item_type": item.item_type,
+            "role": item.role,
+            "content": item.content,
+            "agent_name": item.agent_name,
+            "tool_name": item.tool_name,
+            "tool_args": orjson.loads(item.tool_args_json) if item.tool_args_json else None,
+            "tool_output": item.tool_output,
+            "tool_status": item.tool_status,
+            "artifact_type": item.artifact_type,
+            "artifact_title": item.artifact_title,
+            "iteration": item.iteration,
+            "version": item.version,
+            "created_at": item.created_at
+        }
+        async for item in result
+    ]
+    
+    headers = {"ETag": etag}
+    if limit is not None and len(items) > limit:
+        items = items[:limit]
+        headers[NEXT_CURSOR_HEADER] = str(items[-1]["sequence"])
+    
+    return ORJSONResponse(items, headers=headers)
 
 
 @router.get("/{session_id}/hitl-status", response_model=HITLStatusResponse)
@@ -519,13 +693,7 @@ async def get_hitl_status(
     if approval is pending. Used to restore approval UI state on page reload.
     """
     # First verify session belongs to user
-    result = await db.execute(
-        select(Session)
-        .where(Session.id == session_id)
-        .where(Session.user_id == user_id)
-    )
-    if not result.scalar_one_or_none():
-        raise HTTPException(status_code=404, detail="Session not found")
+    await ensure_session_owned(db, session_id, user_id)
     
     # Find any workflow run with hitl_pending = True
     result = await db.execute(
@@ -6,9 +6,10 @@ Uses Neon PostgreSQL with connection pooling.
 """
 
 from typing import AsyncGenerator, Optional
+from sqlalchemy import MetaData, text
+from sqlalchemy.schema import CreateIndex
 from sqlmodel import SQLModel
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
 
 from backend.settings import settings
 
@@ -43,16 +44,17 @@ async_session_maker = None
 if async_database_url:
     engine = create_async_engine(
         async_database_url,
-        echo=settings.DEBUG,  # Log SQL in debug mode
-        pool_pre_ping=True,   # Verify connections before use
-        pool_size=5,          # Connection pool size
-        max_overflow=10,      # Additional connections when pool is full
+        echo=settings.DEBUG,                    # Log SQL in debug mode
+        pool_pre_ping=True,                     # Verify connections before use
+        pool_size=settings.DB_POOL_SIZE,        # Connection pool size
+        max_overflow=settings.DB_MAX_OVERFLOW,  # Additional connections when pool is full
+        pool_recycle=settings.DB_POOL_RECYCLE,  # Replace connections before Neon drops them
+        connect_args={"statement_cache_size": 0} if settings.DB_PGBOUNCER else {},
     )
     
     # Async session factory
-    async_session_maker = sessionmaker(
+    async_session_maker = async_sessionmaker(
         engine,
-        class_=AsyncSession,
         expire_on_commit=False,
         autoflush=False,
     )
@@ -70,15 +72,19 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
     if async_session_maker is None:
         raise RuntimeError("Database not initialized. Set DATABASE_URL in .env")
     
-    async with async_session_maker() as session:
-        try:
-            yield session
-            await session.commit()
-        except Exception:
-            await session.rollback()
-            raise
-        finally:
-            await session.close()
+    # Pin one pooled connection for the whole request so every statement
+    # (even across a mid-request commit) hits the same asyncpg
+    # prepared-statement cache instead of re-acquiring from the pool
+    async with engine.connect() as conn:
+        async with async_session_maker(bind=conn) as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+            finally:
+                await session.close()
 
 
 async def create_tables():
@@ -94,6 +100,69 @@ async def create_tables():
         await conn.run_sync(SQLModel.metadata.create_all)
 
 
+# Advisory lock key serializing index builds across worker processes
+INDEX_BUILD_LOCK_KEY = 0x63657269  # "ceri"
+
+
+async def ensure_indexes():
+    """
+    Build model indexes missing from an existing database.
+    
+    create_all() only creates indexes along with new tables, so indexes added
+    to the models later never reach deployed databases. Each one is built
+    with CREATE INDEX CONCURRENTLY IF NOT EXISTS (no write lock on the table,
+    a no-op once it exists). Call on application startup, in the background.
+    """
+    if engine is None:
+        raise RuntimeError("Database not initialized. Set DATABASE_URL in .env")
+    
+    # Build the DDL from a private copy of the tables, so the shared metadata
+    # is never modified
+    scratch = MetaData()
+    tables = [table.to_metadata(scratch) for table in SQLModel.metadata.sorted_tables]
+    
+    try:
+        async with engine.connect() as conn:
+            # CONCURRENTLY can't run inside a transaction block
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            
+            # One process builds at a time; the others then find every index
+            # in place. An unfinished concurrent build looks INVALID, so it
+            # must never be mistaken for a failed one from another process
+            await conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": INDEX_BUILD_LOCK_KEY})
+            try:
+                # A failed concurrent build leaves an INVALID index that IF NOT
+                # EXISTS would skip forever: drop those (model tables only)
+                result = await conn.execute(
+                    text(
+                        "SELECT c.relname FROM pg_index i "
+                        "JOIN pg_class c ON c.oid = i.indexrelid "
+                        "JOIN pg_class t ON t.oid = i.indrelid "
+                        "JOIN pg_namespace n ON n.oid = t.relnamespace "
+                        "WHERE NOT i.indisvalid AND n.nspname = current_schema() "
+                        "AND t.relname = ANY(:tables)"
+                    ),
+                    {"tables": [table.name for table in tables]}
+                )
+                invalid = {name for (name,) in result}
+                
+                for table in tables:
+                    for index in sorted(table.indexes, key=lambda index: index.name):
+                        if index.name in invalid:
+                            await conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+                        
+                        index.dialect_options["postgresql"]["concurrently"] = True
+                        try:
+                            await conn.execute(CreateIndex(index, if_not_exists=True))
+                        except Exception as e:
+                            # e.g. duplicate rows blocking a unique index: keep going
+                            print(f"⚠️ Could not build index {index.name}: {e}")
+            finally:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": INDEX_BUILD_LOCK_KEY})
+    except Exception as e:
+        print(f"⚠️ Index check failed: {e}")
+
+
 async def drop_tables():
     """
     Drop all tables (use with caution!).
@@ -114,20 +183,30 @@ async def init_checkpointer():
     Uses PostgresSaver when DATABASE_URL is set, falls back to MemorySaver.
     Call this on application startup AFTER create_tables().
     """
-    global checkpointer, _checkpointer_context
+    global checkpointer, _checkpointer_pool
     
     if settings.DATABASE_URL:
         from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+        from psycopg.rows import dict_row
+        from psycopg_pool import AsyncConnectionPool
         
         # PostgresSaver uses psycopg3, not asyncpg
         db_url = settings.DATABASE_URL
         
         print("🔄 Initializing PostgreSQL checkpointer...")
         
-        # from_conn_string returns an async context manager
-        # We need to enter it manually and keep it open for the app lifetime
-        _checkpointer_context = AsyncPostgresSaver.from_conn_string(db_url)
-        checkpointer = await _checkpointer_context.__aenter__()
+        # Own explicitly sized pool (instead of from_conn_string's defaults) so
+        # the checkpointer's connections stay within the per-worker budget
+        # alongside the SQLAlchemy engine pool; kept open for the app lifetime
+        _checkpointer_pool = AsyncConnectionPool(
+            db_url,
+            min_size=1,
+            max_size=settings.CHECKPOINTER_POOL_SIZE,
+            open=False,
+            kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+        )
+        await _checkpointer_pool.open()
+        checkpointer = AsyncPostgresSaver(_checkpointer_pool)
         
         # Setup creates the checkpoint tables if needed
         await checkpointer.setup()
@@ -137,11 +216,11 @@ async def init_checkpointer():
         
         print("⚠️ No DATABASE_URL - using in-memory checkpointer (state lost on restart)")
         checkpointer = MemorySaver()
-        _checkpointer_context = None
+        _checkpointer_pool = None
 
 
-# Store the context manager so we can close it on shutdown
-_checkpointer_context = None
+# Store the connection pool so we can close it on shutdown
+_checkpointer_pool = None
 
 
 async def close_checkpointer():
@@ -150,15 +229,15 @@ async def close_checkpointer():
     
     Call this on application shutdown.
     """
-    global checkpointer, _checkpointer_context
+    global checkpointer, _checkpointer_pool
     
-    if _checkpointer_context is not None:
+    if _checkpointer_pool is not None:
         print("🔄 Closing PostgreSQL checkpointer...")
-        await _checkpointer_context.__aexit__(None, None, None)
+        await _checkpointer_pool.close()
         print("✅ Checkpointer closed")
     
     checkpointer = None
-    _checkpointer_context = None
+    _checkpointer_pool = None
 
 
 def get_checkpointer():
@@ -1,14 +1,17 @@
 """
 Event Emitter for real-time streaming of agent events to WebSocket.
-Uses asyncio Queue to decouple agent execution from WebSocket streaming.
+Uses a deque plus an asyncio Event to decouple agent execution from WebSocket streaming.
 """
 import asyncio
-from typing import Optional, Dict, Any
+import orjson
+from collections import deque
+from typing import Optional, Dict, Any, List, Tuple, Callable, AsyncIterator
 from dataclasses import dataclass, field
 from enum import Enum
 
 
-class EventType(Enum):
+class EventType(str, Enum):
+    """Event kinds; str-backed so members compare and serialize as their values."""
     THOUGHT = "thought"
     THOUGHT_CHUNK = "thought_chunk"
     MESSAGE_CHUNK = "message_chunk"
@@ -28,9 +31,22 @@ class EventType(Enum):
     PLAN_PENDING_APPROVAL = "plan_pending_approval"  # Workflow halted, awaiting user decision
 
 
-@dataclass
+# Streamed token events whose adjacent runs (same agent) can be merged into one
+_COALESCABLE_TYPES = frozenset({EventType.THOUGHT_CHUNK, EventType.MESSAGE_CHUNK})
+
+# Queue depth beyond which a falling-behind consumer gets new chunk events merged
+# into the newest queued chunk instead of as extra entries (other events always queue)
+CHUNK_HIGH_WATERMARK = 10000
+
+
+@dataclass(slots=True)
 class AgentEvent:
-    """Represents a single event from an agent."""
+    """
+    Represents a single event from an agent.
+    
+    Slotted (no per-instance __dict__): one is allocated for every streamed
+    chunk, so instances stay small and attribute reads in to_dict stay cheap.
+    """
     type: EventType
     agent: str
     content: str = ""
@@ -44,57 +60,114 @@ class AgentEvent:
     # New fields for reflection loop
     iteration: Optional[int] = None   # Reflection iteration number
     version: Optional[int] = None     # Draft version number
+    # JSON text of to_dict(), filled in by the producer at emit time
+    _encoded: Optional[str] = field(default=None, repr=False, compare=False)
+    # Contents of chunks merged into this one under backpressure, joined into
+    # content once when the consumer takes it
+    _parts: Optional[List[str]] = field(default=None, repr=False, compare=False)
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization."""
-        result = {
-            "type": self.type.value,
-            "agent": self.agent,
-            "content": self.content,
-        }
-        if self.tool_name:
-            result["tool_name"] = self.tool_name
-        if self.tool_args:
-            result["tool_args"] = self.tool_args
-        if self.tool_output:
-            result["tool_output"] = self.tool_output
-        if self.artifact_type:
-            result["artifact_type"] = self.artifact_type
-        if self.artifact_title:
-            result["artifact_title"] = self.artifact_title
-        if self.messages is not None:
-            result["messages"] = self.messages
-        if self.scratchpad is not None:
-            result["scratchpad"] = self.scratchpad
-        if self.iteration is not None:
-            result["iteration"] = self.iteration
-        if self.version is not None:
-            result["version"] = self.version
+        return _SERIALIZERS[self.type](self)
+    
+    def to_json(self) -> str:
+        """JSON text of to_dict(), encoded once and cached on the event."""
+        if self._encoded is None:
+            self._encoded = orjson.dumps(self.to_dict(), option=orjson.OPT_NON_STR_KEYS).decode()
+        return self._encoded
+
+
+# Optional fields each event type carries (as set by the EventEmitter.emit_*
+# helpers); to_dict only inspects these, so chunk events need no field checks
+_EVENT_FIELDS: Dict[EventType, Tuple[str, ...]] = {
+    EventType.TOOL_CALL: ("tool_name", "tool_args"),
+    EventType.TOOL_RESULT: ("tool_name", "tool_args", "tool_output"),
+    EventType.ARTIFACT: ("artifact_type", "artifact_title"),
+    EventType.AGENT_MEMORY: ("messages", "scratchpad"),
+    EventType.CRITIQUE_DOCUMENT: ("iteration",),
+    EventType.DRAFT_UPDATED: ("version",),
+    EventType.REFLECTION_STATUS: ("iteration",),
+    EventType.PLAN_PENDING_APPROVAL: ("artifact_title",),
+}
+
+# Fields serialized only when truthy; all others whenever they are not None
+_TRUTHY_FIELDS = frozenset({"tool_name", "tool_args", "tool_output", "artifact_type", "artifact_title"})
+
+
+def _make_serializer(event_type: EventType, fields: Tuple[str, ...]) -> Callable[[AgentEvent], Dict[str, Any]]:
+    """Build the to_dict implementation for one event type."""
+    type_value = event_type.value
+    
+    if not fields:
+        def serialize(event: AgentEvent) -> Dict[str, Any]:
+            return {"type": type_value, "agent": event.agent, "content": event.content}
+        return serialize
+    
+    truthy_fields = tuple(name for name in fields if name in _TRUTHY_FIELDS)
+    set_fields = tuple(name for name in fields if name not in _TRUTHY_FIELDS)
+    
+    def serialize(event: AgentEvent) -> Dict[str, Any]:
+        result = {"type": type_value, "agent": event.agent, "content": event.content}
+        for name in truthy_fields:
+            value = getattr(event, name)
+            if value:
+                result[name] = value
+        for name in set_fields:
+            value = getattr(event, name)
+            if value is not None:
+                result[name] = value
         return result
+    return serialize
+
+
+_SERIALIZERS: Dict[EventType, Callable[[AgentEvent], Dict[str, Any]]] = {
+    event_type: _make_serializer(event_type, _EVENT_FIELDS.get(event_type, ()))
+    for event_type in EventType
+}
 
 
 class EventEmitter:
     """
-    Thread-safe event emitter using asyncio Queue.
+    Thread-safe event emitter.
     Agents push events synchronously, WebSocket consumes asynchronously.
+    
+    Single producer / single consumer: producers append straight to a deque
+    (atomic under the GIL) and only a wakeup is scheduled on the loop, so no
+    per-event queue waiters or futures are created. While a wakeup is still
+    pending, further events ride on it instead of scheduling another.
     """
     
+    __slots__ = (
+        "_queue", "_not_empty", "_wakeup_pending", "_loop", "_closed", "_chunk_buffers",
+        "coalesced_count"
+    )
+    
     def __init__(self):
-        self._queue: Optional[asyncio.Queue] = None
+        self._queue: Optional[deque] = None
+        self._not_empty: Optional[asyncio.Event] = None  # Set once events are pending
+        self._wakeup_pending: bool = False  # A _wake() is scheduled but hasn't run yet
         self._loop: Optional[asyncio.AbstractEventLoop] = None
         self._closed: bool = False  # Flag to stop accepting events
+        self._chunk_buffers: Dict[str, list] = {}  # Chunks of persisting streams, per agent
+        self.coalesced_count: int = 0  # Chunks merged under backpressure
     
     def initialize(self, loop: asyncio.AbstractEventLoop):
         """Initialize with the event loop (call from async context)."""
         self._loop = loop
-        self._queue = asyncio.Queue()
+        self._queue = deque()
+        self._not_empty = asyncio.Event()
+        self._wakeup_pending = False
         self._closed = False
+        self._chunk_buffers = {}
+        self.coalesced_count = 0
     
     def close(self):
         """Mark emitter as closed. Future emit() calls will be no-ops."""
         self._closed = True
         self._queue = None
+        self._not_empty = None
         self._loop = None
+        self._chunk_buffers = {}
     
     def emit(self, event: AgentEvent):
         """Emit event if emitter is available and not closed."""
@@ -103,21 +176,124 @@ class EventEmitter:
         if self._closed:
             return
         
-        if self._queue is None or self._loop is None:
+        queue, not_empty, loop = self._queue, self._not_empty, self._loop
+        if queue is None or loop is None:
             return
         
-        # Thread-safe way to put item in queue from sync context
+        if event.type in _COALESCABLE_TYPES:
+            # Backpressure: the consumer is far behind, so fold this chunk into
+            # the newest queued one (same text, one entry) rather than growing
+            # the queue. The consumer only pops from the left, so the tail is
+            # safe to extend; parts are joined once when it is taken
+            if len(queue) > CHUNK_HIGH_WATERMARK:
+                last = queue[-1]
+                if last.type is event.type and last.agent == event.agent:
+                    if last._parts is None:
+                        last._parts = [last.content]
+                    last._parts.append(event.content)
+                    self.coalesced_count += 1
+                    return
+            # Chunks are not pre-encoded: most are merged with their neighbours
+            # before sending, which would discard the encoding
+        else:
+            # Encode on the producer (usually an agent worker thread) so the
+            # websocket consumer on the event loop only has to send the text
+            try:
+                event.to_json()
+            except TypeError:
+                pass  # Not JSON-serializable; left to fail at the consumer as before
+        
+        # deque.append is thread-safe; only the consumer wakeup goes through the loop.
+        # The append happens before the flag check and _wake() clears the flag
+        # before setting, so an event that skips scheduling is always covered
+        # by the pending wakeup (one loop-lock + self-pipe write per burst)
+        queue.append(event)
+        if self._wakeup_pending:
+            return
+        self._wakeup_pending = True
         try:
-            self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+            loop.call_soon_threadsafe(self._wake, not_empty)
         except RuntimeError:
             # Loop may be closed
             pass
     
+    def _wake(self, not_empty: asyncio.Event):
+        """Runs on the loop: re-arm scheduling and wake the consumer."""
+        self._wakeup_pending = False
+        not_empty.set()
+    
     async def get(self) -> AgentEvent:
         """Get next event from queue (async)."""
-        if self._queue is None:
+        queue, not_empty = self._queue, self._not_empty
+        if queue is None:
             raise RuntimeError("EventEmitter not initialized")
-        return await self._queue.get()
+        
+        # Every append is followed by a scheduled set(), so clearing only while
+        # the deque is empty cannot lose a wakeup; stale sets just re-check
+        while not queue:
+            not_empty.clear()
+            await not_empty.wait()
+        return self._take(queue)
+    
+    @staticmethod
+    def _take(queue: deque) -> AgentEvent:
+        """Pop the oldest event, joining any chunks merged into it."""
+        event = queue.popleft()
+        if event._parts is not None:
+            event.content = "".join(event._parts)
+            event._parts = None
+        return event
+    
+    async def get_batch(self, max_n: int = 64) -> List[AgentEvent]:
+        """
+        Wait for the next event, then drain up to max_n - 1 more already queued.
+        
+        Adjacent chunk events from the same agent are merged into one, so a
+        burst of tokens is persisted and sent as a single event.
+        """
+        batch = [await self.get()]
+        queue = self._queue
+        run: Optional[List[str]] = None  # Contents of the chunks merging into batch[-1]
+        
+        for _ in range(max_n - 1):
+            if not queue:
+                break
+            event = self._take(queue)
+            last = batch[-1]
+            if event.type is last.type and event.type in _COALESCABLE_TYPES and event.agent == last.agent:
+                if run is None:
+                    run = [last.content]
+                run.append(event.content)
+                continue
+            if run is not None:
+                batch[-1] = AgentEvent(type=last.type, agent=last.agent, content="".join(run))
+                run = None
+            batch.append(event)
+        
+        if run is not None:
+            last = batch[-1]
+            batch[-1] = AgentEvent(type=last.type, agent=last.agent, content="".join(run))
+        return batch
+    
+    async def iter_batches(self, timeout: float) -> AsyncIterator[AgentEvent]:
+        """
+        Yield events drained through get_batch, one at a time.
+        
+        Events of the current batch not yet yielded when the iterator is closed
+        (the consumer broke out of its loop) are put back at the front of the
+        queue, so callers should aclose() it once done.
+        
+        Raises asyncio.TimeoutError if no event arrives within timeout seconds.
+        """
+        while True:
+            pending = deque(await asyncio.wait_for(self.get_batch(), timeout=timeout))
+            try:
+                while pending:
+                    yield pending.popleft()
+            finally:
+                queue = self._queue
+                if pending and queue is not None:
+                    queue.extendleft(reversed(pending))
     
     def emit_thought(self, agent: str, content: str):
         """Convenience method for thought events."""
@@ -127,16 +303,44 @@ class EventEmitter:
         """Convenience method for streaming thought chunks."""
         self.emit(AgentEvent(type=EventType.THOUGHT_CHUNK, agent=agent, content=content))
     
+    def begin_message(self, agent: str, persist: bool = False):
+        """Open a streaming message.
+        
+        Args:
+            agent: Agent name
+            persist: Buffer the message's chunks and, on emit_message_end, also
+                     emit them as one complete message event (for persistence),
+                     so the caller doesn't need to resend the content. Only
+                     opened streams are buffered; other chunks cost nothing extra
+        """
+        if persist:
+            self._chunk_buffers[agent] = []
+        else:
+            self._chunk_buffers.pop(agent, None)
+    
     def emit_message_chunk(self, agent: str, content: str):
         """Convenience method for streaming message chunks."""
+        if self._chunk_buffers:
+            buffer = self._chunk_buffers.get(agent)
+            if buffer is not None:
+                buffer.append(content)
         self.emit(AgentEvent(type=EventType.MESSAGE_CHUNK, agent=agent, content=content))
     
     def emit_message_end(self, agent: str):
-        """Signal end of a streaming message. Next message_chunk will start a new message."""
+        """Signal end of a streaming message. Next message_chunk will start a new message.
+        
+        If the message was opened with begin_message(persist=True), its buffered
+        chunks are also emitted as one complete message event.
+        """
+        buffer = self._chunk_buffers.pop(agent, None) if self._chunk_buffers else None
         self.emit(AgentEvent(type=EventType.MESSAGE_END, agent=agent, content=""))
+        if buffer:
+            self.emit(AgentEvent(type=EventType.MESSAGE, agent=agent, content="".join(buffer)))
     
     def emit_message(self, agent: str, content: str):
         """Convenience method for complete message events (for persistence)."""
+        if self._chunk_buffers:
+            self._chunk_buffers.pop(agent, None)  # Supersedes any persisting stream
         self.emit(AgentEvent(type=EventType.MESSAGE, agent=agent, content=content))
     
     def emit_tool_call(self, agent: str, tool_name: str, tool_args: Dict[str, Any]):
@@ -184,7 +388,6 @@ class EventEmitter:
     
     def emit_agent_start(self, agent: str, content: str):
         """Emit agent_start event when an agent begins execution."""
-        print("EMITTING AGENT START EVENT :", agent, content)
         self.emit(AgentEvent(type=EventType.AGENT_START, agent=agent, content=content))
     
     def emit_agent_memory(self, agent: str, messages: list, scratchpad: str = ""):
@@ -241,16 +444,15 @@ class EventEmitter:
 
 
 # Global emitter instance (will be initialized per request)
-# We use a context variable approach for thread safety, with a thread-safe 
-# global fallback for cases where contextvars don't propagate (e.g., asyncio.to_thread)
+# We use a context variable approach for thread safety, with a global fallback
+# for cases where contextvars don't propagate (e.g., asyncio.to_thread)
 import contextvars
-import threading
 
 _current_emitter: contextvars.ContextVar[Optional[EventEmitter]] = contextvars.ContextVar('emitter', default=None)
 
-# Thread-safe global fallback for when context vars don't propagate
+# Global fallback for when context vars don't propagate. Reads and writes are
+# single module-global bindings, which are atomic under the GIL, so no lock
 _global_emitter: Optional[EventEmitter] = None
-_emitter_lock = threading.Lock()
 
 
 def get_emitter() -> Optional[EventEmitter]:
@@ -265,9 +467,7 @@ def get_emitter() -> Optional[EventEmitter]:
         return emitter
     
     # Fallback to global reference (for thread scenarios)
-    global _global_emitter
-    with _emitter_lock:
-        return _global_emitter
+    return _global_emitter
 
 
 def set_emitter(emitter: EventEmitter):
@@ -278,13 +478,11 @@ def set_emitter(emitter: EventEmitter):
     global _global_emitter
     _current_emitter.set(emitter)
     # Also set global fallback for thread scenarios
-    with _emitter_lock:
-        _global_emitter = emitter
+    _global_emitter = emitter
 
 
 def clear_emitter():
     """Clear the emitter references (call at end of request)."""
     global _global_emitter
     _current_emitter.set(None)
-    with _emitter_lock:
-        _global_emitter = None
+    _global_emitter = None
@@ -21,10 +21,17 @@ Checkpointing:
 """
 
 import os
-import json
+import asyncio
+import logging
+import functools
+import contextvars
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 from langgraph.graph import StateGraph, END
 from langgraph.types import interrupt
+from backend.events import get_emitter
+from backend.llm import prewarm
 from backend.agents.router import RouterAgent
 from backend.agents.planner import PlannerAgent
 from backend.agents.draftsman import DraftsmanAgent
@@ -39,6 +46,28 @@ from backend.settings import settings
 MAX_REFLECTION_ITERATIONS = 3  # Maximum critique-revision cycles
 
 
+# Node/edge trace messages are debug-level: dropped cheaply unless DEBUG
+# logging is enabled (main.py then routes them through a non-blocking queue)
+logger = logging.getLogger(__name__)
+
+
+# Blocking agent calls run on their own pool rather than the loop's default
+# executor, so they never queue behind (or starve) other to_thread work
+_AGENT_EXECUTOR = ThreadPoolExecutor(max_workers=settings.AGENT_WORKERS, thread_name_prefix="agent")
+
+
+async def run_agent(invoke, state: AgentState):
+    """Run a blocking agent call on the agent pool, carrying over contextvars like asyncio.to_thread."""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_AGENT_EXECUTOR, functools.partial(context.run, invoke, state))
+
+
+def close_agent_executor():
+    """Shut down the agent pool (call on application shutdown)."""
+    _AGENT_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+
+
 # --- Instantiate Agents ---
 router = RouterAgent()
 planner = PlannerAgent()
@@ -48,25 +77,37 @@ reviser = ReviserAgent()
 synthesizer = PresentationSynthesizerAgent()
 
 
+async def prewarm_agents():
+    """
+    Warm the clients on the latency-critical path (call once on server startup).
+    
+    The router handles the first turn of every session and runs as a sync
+    node; the synthesizer streams through the async client.
+    """
+    await asyncio.gather(
+        prewarm(router.llm, use_async=False),
+        prewarm(synthesizer.synthesizer_llm),
+    )
+
+
 # --- Node Functions ---
 
 def call_router(state: AgentState):
     """Entry point - classifies user intent and routes accordingly."""
-    print("--- CALLING ROUTER ---")
+    logger.debug("--- CALLING ROUTER ---")
     return router.invoke(state)
 
 
 def call_planner(state: AgentState):
     """Generates the clinical plan for the CBT exercise."""
-    print("--- CALLING PLANNER ---")
+    logger.debug("--- CALLING PLANNER ---")
     return planner.invoke(state)
 
 
 async def call_draftsman(state: AgentState):
     """Drafts the CBT exercise based on the plan."""
-    print("--- CALLING DRAFTSMAN ---")
-    import asyncio
-    result = await asyncio.to_thread(draftsman.invoke, state)
+    logger.debug("--- CALLING DRAFTSMAN ---")
+    result = await run_agent(draftsman.invoke, state)
     # Initialize max_iterations if not set
     if "max_iterations" not in result:
         result["max_iterations"] = MAX_REFLECTION_ITERATIONS
@@ -78,9 +119,8 @@ async def call_critic(state: AgentState):
     Evaluates the current draft with 3 specialized critics.
     Returns critique_document, critique_approved, critique_data.
     """
-    print(f"--- CALLING CRITIC (Iteration {state.get('reflection_iteration', 1)}) ---")
-    import asyncio
-    return await asyncio.to_thread(critic.invoke, state)
+    logger.debug("--- CALLING CRITIC (Iteration %s) ---", state.get('reflection_iteration', 1))
+    return await run_agent(critic.invoke, state)
 
 
 async def call_reviser(state: AgentState):
@@ -88,9 +128,9 @@ async def call_reviser(state: AgentState):
     Revises the draft based on critique feedback.
     Updates current_draft and increments reflection_iteration.
     """
-    print(f"--- CALLING REVISER (Iteration {state.get('reflection_iteration', 1)}) ---")
-    import asyncio
-    return await asyncio.to_thread(reviser.invoke, state)
+    logger.debug("--- CALLING REVISER (Iteration %s) ---", state.get('reflection_iteration', 1))
+    # Native async: the revision and its summary run concurrently on the loop
+    return await reviser.ainvoke(state)
 
 
 async def call_synthesizer(state: AgentState):
@@ -98,14 +138,14 @@ async def call_synthesizer(state: AgentState):
     Final formatting pass for approved draft.
     Produces the final_presentation.
     """
-    print("--- CALLING SYNTHESIZER ---")
-    import asyncio
-    return await asyncio.to_thread(synthesizer.invoke, state)
+    logger.debug("--- CALLING SYNTHESIZER ---")
+    # Native async: no worker thread needed for the Gemini round-trip
+    return await synthesizer.ainvoke(state)
 
 
 def respond(state: AgentState):
     """Terminal node for direct conversation responses (no state change needed)."""
-    print("--- DIRECT RESPONSE ---")
+    logger.debug("--- DIRECT RESPONSE ---")
     return {}
 
 
@@ -116,9 +156,7 @@ def await_plan_approval(state: AgentState):
     Emits the plan for user approval, then blocks until user resumes.
     User can: Approve (→ draftsman), Revise (→ planner), or Reject (→ END).
     """
-    from backend.events import get_emitter
-    
-    print("--- AWAITING PLAN APPROVAL ---")
+    logger.debug("--- AWAITING PLAN APPROVAL ---")
     
     # Check if we're resuming from a previous interrupt (Bug #4 fix)
     # If hitl_pending is already True, we're resuming - don't emit again
@@ -130,13 +168,15 @@ def await_plan_approval(state: AgentState):
         plan_json = state.get("plan", "")
         revision_count = state.get("plan_revision_count", 0)
         
-        # Try to extract user_preview from plan JSON
-        user_preview = ""
-        try:
-            plan_data = json.loads(plan_json) if isinstance(plan_json, str) else plan_json
-            user_preview = plan_data.get("user_preview", "")
-        except (json.JSONDecodeError, AttributeError):
-            user_preview = ""
+        # The planner stores user_preview alongside the plan; only checkpoints
+        # written before that field existed need the plan JSON parsed for it
+        user_preview = state.get("plan_user_preview")
+        if user_preview is None:
+            try:
+                plan_data = orjson.loads(plan_json) if isinstance(plan_json, str) else plan_json
+                user_preview = plan_data.get("user_preview", "")
+            except (orjson.JSONDecodeError, AttributeError, TypeError):
+                user_preview = ""
         
         # Customize message based on whether this is a revision
         if revision_count > 0:
@@ -168,9 +208,9 @@ def await_plan_approval(state: AgentState):
     decision = user_decision.get("decision", "rejected") if isinstance(user_decision, dict) else "rejected"
     feedback = user_decision.get("feedback", "") if isinstance(user_decision, dict) else ""
     
-    print(f"📋 User decision: {decision}")
+    logger.debug("📋 User decision: %s", decision)
     if feedback:
-        print(f"   Feedback: {feedback[:100]}..." if len(feedback) > 100 else f"   Feedback: {feedback}")
+        logger.debug("   Feedback: %s", f"{feedback[:100]}..." if len(feedback) > 100 else feedback)
     
     # Update revision count if user requested revision
     revision_count = state.get("plan_revision_count", 0)
@@ -187,15 +227,16 @@ def await_plan_approval(state: AgentState):
 
 # --- Routing Logic ---
 
+# Router classification → next node (anything else goes to the planner)
+_ROUTE_MAP = {"conversation": "respond", "draftsman": "draftsman"}
+
+# HITL decision → next node (anything else, i.e. rejected, ends the workflow)
+_APPROVAL_ROUTE_MAP = {"approved": "draftsman", "revised": "planner"}
+
+
 def route_decision(state: AgentState) -> str:
     """Conditional edge function - routes based on router's classification."""
-    route = state.get("route", "planner")
-    if route == "conversation":
-        return "respond"
-    elif route == "draftsman":
-        return "draftsman"
-    else:
-        return "planner"
+    return _ROUTE_MAP.get(state.get("route", "planner"), "planner")
 
 
 def should_continue_reflection(state: AgentState) -> str:
@@ -212,16 +253,16 @@ def should_continue_reflection(state: AgentState) -> str:
     
     # If approved, proceed to synthesis
     if critique_approved:
-        print(f"✅ Draft approved after {reflection_iteration} iteration(s)")
+        logger.debug("✅ Draft approved after %s iteration(s)", reflection_iteration)
         return "synthesizer"
     
     # If max iterations reached, proceed anyway
     if reflection_iteration >= max_iterations:
-        print(f"⚠️ Max iterations ({max_iterations}) reached, proceeding to synthesis")
+        logger.debug("⚠️ Max iterations (%s) reached, proceeding to synthesis", max_iterations)
         return "synthesizer"
     
     # Otherwise, continue revision loop
-    print(f"🔄 Revision needed (iteration {reflection_iteration}/{max_iterations})")
+    logger.debug("🔄 Revision needed (iteration %s/%s)", reflection_iteration, max_iterations)
     return "reviser"
 
 
@@ -235,15 +276,9 @@ def route_after_approval(state: AgentState) -> str:
         END - User rejected the plan
     """
     decision = state.get("hitl_decision")
-    if decision == "approved":
-        print("✅ Plan approved - proceeding to Draftsman")
-        return "draftsman"
-    elif decision == "revised":
-        print(f"✏️ Revision requested - returning to Planner (attempt {state.get('plan_revision_count', 1)})")
-        return "planner"
-    else:
-        print("❌ Plan rejected - terminating workflow")
-        return END
+    target = _APPROVAL_ROUTE_MAP.get(decision, END)
+    logger.debug("📋 Plan decision %r - routing to %s", decision, target)
+    return target
 
 
 # --- Graph Construction ---
@@ -310,19 +345,35 @@ workflow.add_edge("respond", END)
 # --- Checkpointer Setup ---
 # Uses PostgresSaver (from database.py) when DATABASE_URL is set
 # Falls back to MemorySaver for local dev without database
+from backend import database
 from backend.database import get_checkpointer
 
 # Compile with the global checkpointer
 graph = workflow.compile(checkpointer=get_checkpointer())
 
+# Graph compiled against the initialized checkpointer, reused across requests
+_cached_graph = None
+_cached_checkpointer = None
+
 
 def get_compiled_graph():
     """
     Get a compiled graph with the current checkpointer.
     
-    Use this if you need to refresh the checkpointer after init_checkpointer() is called.
+    Compiles once per checkpointer (i.e. after init_checkpointer() is called)
+    and reuses the result, instead of recompiling on every request.
     """
-    return workflow.compile(checkpointer=get_checkpointer())
+    global _cached_graph, _cached_checkpointer
+    
+    current = database.checkpointer
+    if current is None:
+        # Checkpointer not initialized yet: don't cache the temporary fallback
+        return workflow.compile(checkpointer=get_checkpointer())
+    
+    if _cached_graph is None or _cached_checkpointer is not current:
+        _cached_graph = workflow.compile(checkpointer=current)
+        _cached_checkpointer = current
+    return _cached_graph
 
 
 
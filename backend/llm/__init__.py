@@ -0,0 +1,6 @@
+# Backend LLM Package
+# Shared LLM client construction for all agents
+
+from backend.llm.clients import get_gemini, prewarm, run_sync
+
+__all__ = ["get_gemini", "prewarm", "run_sync"]
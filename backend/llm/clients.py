@@ -0,0 +1,111 @@
+"""
+Shared LLM Clients
+
+Agents obtain their Gemini chat models here instead of constructing their own,
+so agents using the same configuration share one client (and its underlying
+HTTP connection pool) for the lifetime of the process.
+"""
+
+import asyncio
+import functools
+import threading
+from typing import Optional
+
+from backend.settings import settings
+
+
+# Unbounded: the set of configurations used across agents is small and fixed,
+# and evicting one would hand later callers a fresh, unshared instance
+@functools.lru_cache(maxsize=None)
+def get_gemini(
+    model: str,
+    temperature: float,
+    thinking_budget: Optional[int] = None,
+    include_thoughts: Optional[bool] = None,
+):
+    """
+    Get the process-wide ChatGoogleGenerativeAI instance for a configuration.
+    
+    Args:
+        model: Gemini model name (e.g., "gemini-2.5-flash-lite")
+        temperature: Sampling temperature
+        thinking_budget: Optional thinking token budget (-1 for dynamic)
+        include_thoughts: Whether to stream thinking blocks
+    
+    Returns:
+        A cached ChatGoogleGenerativeAI. Callers derive tool-bound or
+        structured-output runnables from it rather than mutating it.
+    """
+    # Deferred import keeps importing agent modules cheap
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    
+    options = {}
+    if thinking_budget is not None:
+        options["thinking_budget"] = thinking_budget
+    if include_thoughts is not None:
+        options["include_thoughts"] = include_thoughts
+    
+    return ChatGoogleGenerativeAI(
+        model=model,
+        temperature=temperature,
+        google_api_key=settings.GEMINI_API_KEY,
+        **options,
+    )
+
+
+async def prewarm(llm, use_async: bool = True):
+    """
+    Establish a client's connection with a 1-token request.
+    
+    The first real request otherwise pays for channel setup and the TLS
+    handshake. The sync and async APIs use separate transports, so warm the
+    one the agent actually calls. Meant to be awaited once from the server
+    lifespan: scripts and test harnesses never trigger a billable warm-up.
+    
+    Args:
+        llm: A client returned by get_gemini()
+        use_async: Warm the async transport (ainvoke/astream) rather than
+                   the sync one (invoke/stream)
+    """
+    if not (settings.PREWARM_LLM and settings.GEMINI_API_KEY):
+        return
+    
+    try:
+        if use_async:
+            await llm.ainvoke("ok", generation_config={"max_output_tokens": 1})
+        else:
+            await asyncio.to_thread(llm.invoke, "ok", generation_config={"max_output_tokens": 1})
+    except Exception as e:
+        # Warm-up is best effort: the real request will surface real errors
+        print(f"⚠️ LLM warm-up failed: {e}")
+
+
+# Loop that sync entry points run agent coroutines on. The cached clients'
+# async transports bind to the loop they first run on, so every sync call
+# must reuse one long-lived loop rather than a fresh asyncio.run() loop
+_sync_loop: Optional[asyncio.AbstractEventLoop] = None
+_sync_loop_lock = threading.Lock()
+
+
+def run_sync(coro):
+    """
+    Run an agent coroutine to completion from synchronous code (scripts only).
+    
+    Raises:
+        RuntimeError: If called from a thread with a running event loop;
+                      async callers must await the coroutine directly
+    """
+    global _sync_loop
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        coro.close()
+        raise RuntimeError("Synchronous invoke() called inside a running event loop; await ainvoke() instead")
+    
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(target=_sync_loop.run_forever, name="llm-sync-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _sync_loop).result()
@@ -1,46 +1,110 @@
+import asyncio
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
-from backend.graph import get_compiled_graph
+from backend.graph import get_compiled_graph, close_agent_executor, prewarm_agents
 from langchain_core.messages import HumanMessage
 from backend.websocket_routes import router as websocket_router
 from backend.api.sessions import router as sessions_router
-from backend.database import create_tables, init_checkpointer, close_checkpointer
+from backend.database import create_tables, ensure_indexes, init_checkpointer, close_checkpointer
+from backend.persistence import start_writer, stop_writer
 from backend.settings import settings
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler - runs on startup/shutdown."""
+    # Debug trace logging: records go through a queue and a listener thread
+    # writes them out, so the event loop never blocks on stdout
+    log_listener = None
+    if settings.DEBUG:
+        log_queue = queue.SimpleQueue()
+        backend_logger = logging.getLogger("backend")
+        backend_logger.setLevel(logging.DEBUG)
+        backend_logger.addHandler(QueueHandler(log_queue))
+        log_listener = QueueListener(log_queue, logging.StreamHandler())
+        log_listener.start()
+    
     # Startup: Create database tables
+    index_task = None
     if settings.DATABASE_URL:
         print("🗄️ Initializing database...")
         await create_tables()
         print("✅ Database tables ready")
+        
+        # Indexes added after a table was created: built concurrently in the
+        # background so startup doesn't wait on large tables
+        index_task = asyncio.create_task(ensure_indexes())
+        
+        # Batched background writer for append-only persistence rows
+        start_writer()
     else:
         print("⚠️ DATABASE_URL not set - skipping database initialization")
     
     # Initialize checkpointer (PostgresSaver or MemorySaver fallback)
     await init_checkpointer()
     
+    # Compile the workflow once up front; requests reuse the cached graph
+    get_compiled_graph()
+    
+    # Connect to Gemini in the background; startup doesn't wait on it
+    warmup_task = asyncio.create_task(prewarm_agents())
+    
     yield
     
-    # Shutdown: cleanup checkpointer connection
+    warmup_task.cancel()
+    if index_task is not None:
+        index_task.cancel()
+    # Shutdown: flush queued rows, then cleanup checkpointer connection
+    await stop_writer()
     await close_checkpointer()
+    close_agent_executor()
     print("👋 Shutting down...")
+    if log_listener is not None:
+        log_listener.stop()
 
 
 app = FastAPI(lifespan=lifespan)
 
-# Allow CORS for frontend
+# --- Backpressure for DB-backed REST endpoints ---
+# At most as many in-flight requests as the DB pool can serve; beyond that,
+# fail fast with 503 instead of queueing on pool_timeout
+DB_REQUEST_SLOTS = asyncio.Semaphore(settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW)
+DB_SLOT_WAIT_SECONDS = 0.05
+
+
+@app.middleware("http")
+async def db_backpressure(request: Request, call_next):
+    """Bound concurrent /api/ requests to the database pool capacity."""
+    if not request.url.path.startswith("/api/"):
+        return await call_next(request)
+    
+    try:
+        await asyncio.wait_for(DB_REQUEST_SLOTS.acquire(), timeout=DB_SLOT_WAIT_SECONDS)
+    except asyncio.TimeoutError:
+        return JSONResponse(status_code=503, content={"detail": "busy"})
+    
+    try:
+        return await call_next(request)
+    finally:
+        DB_REQUEST_SLOTS.release()
+
+
+# Allow CORS for frontend (registered after the backpressure middleware so
+# CORS stays outermost and 503 responses still carry CORS headers)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173", "https://cerina-v0.vercel.app"],  # Frontend URL
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],  # Let browser clients read the caching/paging headers
 )
 
 # Include routers
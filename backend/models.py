@@ -7,6 +7,7 @@ Supports session management, workflow tracking, and agent event logging.
 
 from datetime import datetime
 from typing import Optional
+from sqlalchemy import Index, text
 from sqlmodel import SQLModel, Field
 
 from backend.utils.id_generator import (
@@ -28,6 +29,10 @@ class Session(SQLModel, table=True):
     multiple workflow runs and messages.
     """
     __tablename__ = "sessions"
+    __table_args__ = (
+        # Sidebar listing: active sessions of a user, most recently updated first
+        Index("ix_sessions_user_active_updated", "user_id", "is_active", "updated_at"),
+    )
     
     id: str = Field(default_factory=generate_session_id, primary_key=True)
     user_id: str = Field(index=True)  # Firebase UID
@@ -45,6 +50,15 @@ class WorkflowRun(SQLModel, table=True):
     Tracks status for resumption of interrupted workflows.
     """
     __tablename__ = "workflow_runs"
+    __table_args__ = (
+        # Runs of a session, ordered by start time
+        Index("ix_workflow_runs_session_started", "session_id", "started_at"),
+        # HITL status check: only the (rare) runs awaiting approval are indexed
+        Index(
+            "ix_workflow_runs_session_hitl_pending", "session_id", "started_at",
+            postgresql_where=text("hitl_pending")
+        ),
+    )
     
     id: str = Field(default_factory=generate_workflow_run_id, primary_key=True)
     session_id: str = Field(foreign_key="sessions.id", index=True)
@@ -71,6 +85,10 @@ class Message(SQLModel, table=True):
     For detailed agent activity, see AgentEvent.
     """
     __tablename__ = "messages"
+    __table_args__ = (
+        # Messages of a session, ordered by creation time (id: keyset tie-break)
+        Index("ix_messages_session_created_id", "session_id", "created_at", "id"),
+    )
     
     id: str = Field(default_factory=generate_message_id, primary_key=True)
     session_id: str = Field(foreign_key="sessions.id", index=True)
@@ -88,6 +106,10 @@ class AgentEvent(SQLModel, table=True):
     from each agent. Enables "which agent said what?" queries.
     """
     __tablename__ = "agent_events"
+    __table_args__ = (
+        # Run-scoped event listings are ordered by creation time (id: keyset tie-break)
+        Index("ix_agent_events_run_created_id", "workflow_run_id", "created_at", "id"),
+    )
     
     id: str = Field(default_factory=generate_event_id, primary_key=True)
     workflow_run_id: str = Field(foreign_key="workflow_runs.id", index=True)
@@ -110,6 +132,10 @@ class Artifact(SQLModel, table=True):
     Tracks version history and which agent/iteration produced each artifact.
     """
     __tablename__ = "artifacts"
+    __table_args__ = (
+        # Artifacts of a session, ordered by creation time (id: keyset tie-break)
+        Index("ix_artifacts_session_created_id", "session_id", "created_at", "id"),
+    )
     
     id: str = Field(default_factory=generate_artifact_id, primary_key=True)
     workflow_run_id: str = Field(foreign_key="workflow_runs.id", index=True)
@@ -132,6 +158,10 @@ class AgentMemory(SQLModel, table=True):
     for transparency and debugging.
     """
     __tablename__ = "agent_memories"
+    __table_args__ = (
+        # Run-scoped memory snapshots are ordered by creation time
+        Index("ix_agent_memories_run_created", "workflow_run_id", "created_at"),
+    )
     
     id: str = Field(default_factory=generate_memory_id, primary_key=True)
     workflow_run_id: str = Field(foreign_key="workflow_runs.id", index=True)
@@ -155,6 +185,11 @@ class ChatHistoryItem(SQLModel, table=True):
     via WebSocket and discarded.
     """
     __tablename__ = "chat_history"
+    __table_args__ = (
+        # Chat history of a session in display order. Unique, so two processes
+        # numbering the same session can't silently write duplicate sequences
+        Index("uq_chat_history_session_sequence", "session_id", "sequence", unique=True),
+    )
     
     id: str = Field(default_factory=generate_chat_history_id, primary_key=True)
     session_id: str = Field(foreign_key="sessions.id", index=True)
@@ -9,13 +9,23 @@ Provides async helper functions for persisting:
 - Agent memory snapshots
 - Chat history
 - Session titles
+
+Append-only rows (messages, agent events, artifacts, memories, chat history)
+are queued to a single background writer that inserts them in batches, one
+transaction per flush, instead of one session and commit per row.
 """
 
+import asyncio
+import logging
+from collections import OrderedDict
 from datetime import datetime
-from typing import Optional
-import json
+from typing import Optional, Dict, List, Tuple, Type
+
+import orjson
 
-from sqlmodel import select, func
+from sqlalchemy import insert
+from sqlalchemy.exc import InterfaceError, OperationalError, TimeoutError as PoolTimeoutError
+from sqlmodel import SQLModel, select, func
 from backend.database import async_session_maker
 from backend.models import (
     Session, Message, WorkflowRun,
@@ -23,6 +33,231 @@ from backend.models import (
     ChatHistoryItem
 )
 
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Batched Writer
+# =============================================================================
+
+WRITE_BATCH_SIZE = 500       # Max rows per flush
+WRITE_FLUSH_INTERVAL = 0.05  # Seconds a burst may accumulate before flushing
+
+_STOP = object()  # Queue sentinel: flush what's pending, then exit
+
+_write_queue: Optional[asyncio.Queue] = None
+_writer_task: Optional[asyncio.Task] = None
+
+# Last chat history sequence written per session. The writer is the only code
+# numbering rows in this process, so once a session has been seen its counter
+# stays current and later appends need no MAX(sequence) lookup (LRU-bounded).
+# This assumes one process writes a session's history (see settings); if
+# another one does too, the unique (session_id, sequence) index rejects the
+# batch and the affected counters are re-read from the database
+SEQUENCE_CACHE_MAX_SESSIONS = 1024
+_last_sequences: "OrderedDict[str, int]" = OrderedDict()
+
+
+def start_writer():
+    """
+    Start the background writer. Call on application startup (inside the loop).
+    
+    Until it runs (e.g. scripts), the save helpers fall back to direct writes.
+    """
+    global _write_queue, _writer_task
+    if async_session_maker is None or _writer_task is not None:
+        return
+    _write_queue = asyncio.Queue()
+    _writer_task = asyncio.create_task(_run_writer(_write_queue))
+
+
+async def stop_writer():
+    """Flush all queued rows and stop the writer. Call on application shutdown."""
+    global _write_queue, _writer_task
+    if _writer_task is None:
+        return
+    _write_queue.put_nowait(_STOP)
+    await _writer_task
+    _write_queue = None
+    _writer_task = None
+
+
+async def _insert_now(row: SQLModel):
+    """
+    Write one row immediately with a Core INSERT.
+    
+    Ids and timestamps are generated client-side, so there is nothing to read
+    back: no unit-of-work flush and no refresh() SELECT.
+    """
+    async with async_session_maker() as db:
+        await db.execute(insert(type(row)).values(**row.model_dump()))
+        await db.commit()
+
+
+def _enqueue(row: SQLModel) -> bool:
+    """Queue a row for the writer. Returns False if it isn't running."""
+    if _write_queue is None:
+        return False
+    _write_queue.put_nowait((type(row), row.model_dump()))
+    return True
+
+
+async def _run_writer(queue: asyncio.Queue):
+    """Drain the queue in bursts and flush each burst in one transaction."""
+    while True:
+        batch: List[Tuple[Type[SQLModel], dict]] = []
+        item = await queue.get()
+        if item is not _STOP:
+            batch.append(item)
+            # Let the rest of the burst arrive, then take up to a full batch
+            await asyncio.sleep(WRITE_FLUSH_INTERVAL)
+            while len(batch) < WRITE_BATCH_SIZE and not queue.empty():
+                item = queue.get_nowait()
+                if item is _STOP:
+                    break
+                batch.append(item)
+        
+        if batch:
+            await _flush(batch)
+        if item is _STOP:
+            return
+
+
+def _is_transient(error: Exception) -> bool:
+    """Whether a write failed on the connection rather than on the rows."""
+    return (
+        isinstance(error, (OperationalError, InterfaceError, PoolTimeoutError, OSError, asyncio.TimeoutError))
+        or getattr(error, "connection_invalidated", False)
+    )
+
+
+async def _write_rows(rows_by_model: Dict[Type[SQLModel], List[dict]]) -> Dict[str, int]:
+    """
+    Insert rows in one transaction: one executemany INSERT per table.
+    Returns the new last chat history sequence per session.
+    """
+    async with async_session_maker() as db:
+        chat_rows = rows_by_model.get(ChatHistoryItem)
+        last_sequences = await _assign_sequences(db, chat_rows) if chat_rows else {}
+        
+        for model, rows in rows_by_model.items():
+            await db.execute(insert(model), rows)
+        await db.commit()
+    return last_sequences
+
+
+async def _write_rows_retrying(rows_by_model: Dict[Type[SQLModel], List[dict]]) -> Dict[str, int]:
+    """Write rows, retrying the transaction once if the connection failed."""
+    try:
+        return await _write_rows(rows_by_model)
+    except Exception as e:
+        if not _is_transient(e):
+            raise
+        logger.warning("Connection error writing queued rows, retrying: %s", e)
+        return await _write_rows(rows_by_model)
+
+
+def _remember_sequences(last_sequences: Dict[str, int]):
+    """Advance the cached counters (only once the rows are committed)."""
+    for session_id, sequence in last_sequences.items():
+        _last_sequences[session_id] = sequence
+        _last_sequences.move_to_end(session_id)
+    while len(_last_sequences) > SEQUENCE_CACHE_MAX_SESSIONS:
+        _last_sequences.popitem(last=False)
+
+
+async def _flush(batch: List[Tuple[Type[SQLModel], dict]]):
+    """
+    Insert a batch of rows in one transaction.
+    
+    Callers already hold the ids of these rows, so a failed flush falls back
+    to one transaction per table, then per row, so that a bad row only loses
+    itself instead of the whole burst.
+    """
+    rows_by_model: Dict[Type[SQLModel], List[dict]] = {}
+    for model, row in batch:
+        rows_by_model.setdefault(model, []).append(row)
+    
+    try:
+        _remember_sequences(await _write_rows_retrying(rows_by_model))
+        return
+    except Exception:
+        # Counters may be stale (another process wrote these sessions):
+        # the fallback writes re-read them from the database
+        for row in rows_by_model.get(ChatHistoryItem, ()):
+            _last_sequences.pop(row["session_id"], None)
+        logger.exception("Failed to flush %d queued rows, writing them individually", len(batch))
+    
+    for model, rows in rows_by_model.items():
+        if len(rows_by_model) > 1:
+            try:
+                _remember_sequences(await _write_rows_retrying({model: rows}))
+                continue
+            except Exception:
+                logger.exception("Failed to flush %d queued %s rows", len(rows), model.__tablename__)
+        
+        for index, row in enumerate(rows):
+            try:
+                _remember_sequences(await _write_rows_retrying({model: [row]}))
+            except Exception as e:
+                logger.exception("Dropped queued %s row %s", model.__tablename__, row.get("id"))
+                if model is ChatHistoryItem:
+                    _last_sequences.pop(row["session_id"], None)
+                if _is_transient(e):
+                    # The database is unreachable, not the row: stop hammering it
+                    logger.error(
+                        "Dropped %d remaining queued %s rows",
+                        len(rows) - index - 1, model.__tablename__
+                    )
+                    break
+
+
+async def _assign_sequences(db, rows: List[dict]) -> Dict[str, int]:
+    """
+    Number queued chat history rows per session, continuing from the last
+    written sequence. Returns the new last sequence per session.
+    """
+    last_sequence: Dict[str, Optional[int]] = {}
+    unknown = set()
+    for row in rows:
+        session_id = row["session_id"]
+        if session_id in _last_sequences:
+            last_sequence[session_id] = _last_sequences[session_id]
+        else:
+            unknown.add(session_id)
+    
+    # Sessions this writer hasn't numbered yet: one lookup for all of them
+    if unknown:
+        result = await db.execute(
+            select(ChatHistoryItem.session_id, func.max(ChatHistoryItem.sequence))
+            .where(ChatHistoryItem.session_id.in_(unknown))
+            .group_by(ChatHistoryItem.session_id)
+        )
+        last_sequence.update(result.all())
+    
+    # Queue order is append order, so numbering in batch order preserves it
+    for row in rows:
+        sequence = (last_sequence.get(row["session_id"]) or 0) + 1
+        last_sequence[row["session_id"]] = sequence
+        row["sequence"] = sequence
+    return last_sequence
+
+
+# =============================================================================
+# Save Helpers
+# =============================================================================
+
+# Column caps for streamed text
+MAX_CONTENT_CHARS = 10000
+MAX_TOOL_OUTPUT_CHARS = 5000
+
+
+def _cap(text: Optional[str], limit: int) -> Optional[str]:
+    """Truncate text to limit characters; short (typical) strings pass through untouched."""
+    if text and len(text) > limit:
+        return text[:limit]
+    return text
+
 
 async def save_message(
     session_id: str, 
@@ -34,17 +269,15 @@ async def save_message(
     if not session_id or not async_session_maker:
         return None
     try:
-        async with async_session_maker() as db:
-            msg = Message(
-                session_id=session_id,
-                role=role,
-                content=content,
-                workflow_run_id=workflow_run_id
-            )
-            db.add(msg)
-            await db.commit()
-            await db.refresh(msg)
-            return msg.id
+        msg = Message(
+            session_id=session_id,
+            role=role,
+            content=content,
+            workflow_run_id=workflow_run_id
+        )
+        if not _enqueue(msg):
+            await _insert_now(msg)
+        return msg.id  # Generated client-side, valid before the row is written
     except Exception as e:
         print(f"Failed to save message: {e}")
         return None
@@ -55,16 +288,13 @@ async def create_workflow_run(session_id: str, user_query: str) -> Optional[str]
     if not session_id or not async_session_maker:
         return None
     try:
-        async with async_session_maker() as db:
-            run = WorkflowRun(
-                session_id=session_id,
-                user_query=user_query,
-                status="running"
-            )
-            db.add(run)
-            await db.commit()
-            await db.refresh(run)
-            return run.id
+        run = WorkflowRun(
+            session_id=session_id,
+            user_query=user_query,
+            status="running"
+        )
+        await _insert_now(run)
+        return run.id
     except Exception as e:
         print(f"Failed to create workflow run: {e}")
         return None
@@ -145,18 +375,17 @@ async def save_agent_event(
     if not workflow_run_id or not async_session_maker:
         return
     try:
-        async with async_session_maker() as db:
-            event = AgentEventModel(
-                workflow_run_id=workflow_run_id,
-                agent_name=agent_name,
-                event_type=event_type,
-                content=content[:10000] if content else "",
-                tool_name=tool_name,
-                tool_args_json=tool_args_json,
-                tool_output=tool_output[:5000] if tool_output else None
-            )
-            db.add(event)
-            await db.commit()
+        event = AgentEventModel(
+            workflow_run_id=workflow_run_id,
+            agent_name=agent_name,
+            event_type=event_type,
+            content=_cap(content, MAX_CONTENT_CHARS) or "",
+            tool_name=tool_name,
+            tool_args_json=tool_args_json,
+            tool_output=_cap(tool_output, MAX_TOOL_OUTPUT_CHARS) or None
+        )
+        if not _enqueue(event):
+            await _insert_now(event)
     except Exception as e:
         print(f"Failed to save agent event: {e}")
 
@@ -175,19 +404,18 @@ async def save_artifact(
     if not workflow_run_id or not session_id or not async_session_maker:
         return
     try:
-        async with async_session_maker() as db:
-            artifact = Artifact(
-                workflow_run_id=workflow_run_id,
-                session_id=session_id,
-                agent_name=agent_name,
-                artifact_type=artifact_type,
-                title=title,
-                content=content,
-                version=version,
-                iteration=iteration
-            )
-            db.add(artifact)
-            await db.commit()
+        artifact = Artifact(
+            workflow_run_id=workflow_run_id,
+            session_id=session_id,
+            agent_name=agent_name,
+            artifact_type=artifact_type,
+            title=title,
+            content=content,
+            version=version,
+            iteration=iteration
+        )
+        if not _enqueue(artifact):
+            await _insert_now(artifact)
     except Exception as e:
         print(f"Failed to save artifact: {e}")
 
@@ -202,15 +430,14 @@ async def save_agent_memory(
     if not workflow_run_id or not async_session_maker:
         return
     try:
-        async with async_session_maker() as db:
-            memory = AgentMemory(
-                workflow_run_id=workflow_run_id,
-                agent_name=agent_name,
-                messages_json=json.dumps(messages) if messages else "[]",
-                scratchpad=scratchpad or ""
-            )
-            db.add(memory)
-            await db.commit()
+        memory = AgentMemory(
+            workflow_run_id=workflow_run_id,
+            agent_name=agent_name,
+            messages_json=orjson.dumps(messages, option=orjson.OPT_NON_STR_KEYS).decode() if messages else "[]",
+            scratchpad=scratchpad or ""
+        )
+        if not _enqueue(memory):
+            await _insert_now(memory)
     except Exception as e:
         print(f"Failed to save agent memory: {e}")
 
@@ -257,7 +484,8 @@ async def append_to_chat_history(
     Append an item to the chat history.
     
     This is the SINGLE function that writes to chat_history table.
-    Each item gets an auto-incrementing sequence number for ordering.
+    Each item gets an auto-incrementing sequence number for ordering
+    (assigned by the batched writer, in append order).
     
     Returns the generated item ID for WebSocket emission (for deduplication).
     
@@ -268,35 +496,35 @@ async def append_to_chat_history(
         return None
     
     try:
+        item = ChatHistoryItem(
+            session_id=session_id,
+            workflow_run_id=workflow_run_id,
+            sequence=0,  # Assigned when the row is written
+            item_type=item_type,
+            role=role,
+            content=_cap(content, MAX_CONTENT_CHARS) or "",
+            agent_name=agent_name,
+            tool_name=tool_name,
+            tool_args_json=orjson.dumps(tool_args, option=orjson.OPT_NON_STR_KEYS).decode() if tool_args else None,
+            tool_output=_cap(tool_output, MAX_TOOL_OUTPUT_CHARS) or None,
+            tool_status=tool_status,
+            artifact_type=artifact_type,
+            artifact_title=artifact_title,
+            iteration=iteration,
+            version=version
+        )
+        if _enqueue(item):
+            return item.id  # Generated client-side, valid before the row is written
+        
         async with async_session_maker() as db:
             # Get next sequence number for this session
             result = await db.execute(
                 select(func.coalesce(func.max(ChatHistoryItem.sequence), 0))
                 .where(ChatHistoryItem.session_id == session_id)
             )
-            max_seq = result.scalar() or 0
-            next_seq = max_seq + 1
-            
-            item = ChatHistoryItem(
-                session_id=session_id,
-                workflow_run_id=workflow_run_id,
-                sequence=next_seq,
-                item_type=item_type,
-                role=role,
-                content=content[:10000] if content else "",
-                agent_name=agent_name,
-                tool_name=tool_name,
-                tool_args_json=json.dumps(tool_args) if tool_args else None,
-                tool_output=tool_output[:5000] if tool_output else None,
-                tool_status=tool_status,
-                artifact_type=artifact_type,
-                artifact_title=artifact_title,
-                iteration=iteration,
-                version=version
-            )
-            db.add(item)
+            item.sequence = (result.scalar() or 0) + 1
+            await db.execute(insert(ChatHistoryItem).values(**item.model_dump()))
             await db.commit()
-            await db.refresh(item)
             return item.id
     except Exception as e:
         print(f"Failed to append to chat history: {e}")
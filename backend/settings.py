@@ -32,8 +32,36 @@ class Settings:
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
     
+    # Chat history sequences are numbered by an in-process counter in the
+    # persistence writer, so run one worker process per instance (the image
+    # starts uvicorn with --workers 1). Concurrent writers to one session from
+    # several processes hit the unique (session_id, sequence) index and are
+    # renumbered from the database, never silently duplicated.
+    
+    # Database connection pool (per worker process: with N uvicorn workers keep
+    # N * (DB_POOL_SIZE + DB_MAX_OVERFLOW + CHECKPOINTER_POOL_SIZE) within the
+    # server's max_connections)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "20"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "3600"))  # Seconds
+    
+    # LangGraph checkpointer pool (psycopg, separate from the SQLAlchemy pool)
+    CHECKPOINTER_POOL_SIZE: int = int(os.getenv("CHECKPOINTER_POOL_SIZE", "4"))
+    
+    # Set when DATABASE_URL points at PgBouncer in transaction pooling mode
+    # (e.g. Neon's pooled "-pooler" host, or a self-hosted PgBouncer on port 6432);
+    # disables asyncpg's prepared statement cache, which such poolers break
+    DB_PGBOUNCER: bool = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+    
     # Debug mode
     DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
+    
+    # Warm up Gemini connections on server startup (costs one 1-token request
+    # per client; off by default, enabled in the production image)
+    PREWARM_LLM: bool = os.getenv("PREWARM_LLM", "false").lower() == "true"
+    
+    # Worker threads dedicated to blocking agent calls (draftsman, critic)
+    AGENT_WORKERS: int = int(os.getenv("AGENT_WORKERS", "8"))
 
     
     @classmethod
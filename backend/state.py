@@ -24,6 +24,7 @@ class AgentState(TypedDict):
         protocol_contract (Optional[Dict]): Protocol constraints from draftsman for critic.
         final_presentation (Optional[str]): Final synthesized document after approval.
         revision_notes (Optional[str]): Notes about what was changed in the last revision.
+        prev_action_items_hash (Optional[str]): Digest of the action items the reviser last applied.
     """
     user_query: str
     route: Optional[str]
@@ -44,10 +45,12 @@ class AgentState(TypedDict):
     protocol_contract: Optional[Dict[str, Any]]
     final_presentation: Optional[str]
     revision_notes: Optional[str]
+    prev_action_items_hash: Optional[str]
     
     # Human-in-the-Loop Fields
     hitl_pending: Optional[bool]           # True when awaiting user approval
     hitl_decision: Optional[str]           # "approved", "revised", "rejected"
     hitl_feedback: Optional[str]           # User's revision feedback (for planner)
     plan_revision_count: Optional[int]     # How many times user requested revision
+    plan_user_preview: Optional[str]       # Plan's user_preview, shown with the approval prompt
 
@@ -5,10 +5,17 @@ Generates prefixed alphanumeric IDs for database entities.
 Uses cryptographically secure random generation.
 """
 
+import time
 import secrets
 import string
 
 
+# Base36 for the timestamp part: digits and lowercase letters sort the same
+# under byte-order and locale-aware collations
+_TIME_CHARS = string.digits + string.ascii_lowercase
+_TIME_WIDTH = 9  # 9 base36 digits of milliseconds since epoch last well past 2100
+
+
 def generate_id(prefix: str, length: int = 10) -> str:
     """
     Generate a prefixed alphanumeric ID.
@@ -31,6 +38,29 @@ def generate_id(prefix: str, length: int = 10) -> str:
     return f"{prefix}{random_part}"
 
 
+def generate_ordered_id(prefix: str, length: int = 10) -> str:
+    """
+    Generate a prefixed ID that starts with a millisecond timestamp.
+    
+    Later IDs sort after earlier ones, so inserts into the primary-key index
+    append at its right edge instead of landing on random pages.
+    
+    Args:
+        prefix: The prefix for the ID (e.g., "EVT_")
+        length: Length of the random suffix (default 10)
+    
+    Returns:
+        A string like "EVT_0mvaept3l7xK9mN2pQ4"
+    """
+    millis = time.time_ns() // 1_000_000
+    time_digits = []
+    for _ in range(_TIME_WIDTH):
+        millis, digit = divmod(millis, 36)
+        time_digits.append(_TIME_CHARS[digit])
+    time_part = "".join(reversed(time_digits))
+    return generate_id(f"{prefix}{time_part}", length)
+
+
 # Convenience functions for each entity type
 def generate_session_id() -> str:
     return generate_id("SES_")
@@ -49,7 +79,7 @@ def generate_artifact_id() -> str:
 
 
 def generate_event_id() -> str:
-    return generate_id("EVT_")
+    return generate_ordered_id("EVT_")  # High write volume: time-ordered
 
 
 def generate_memory_id() -> str:
@@ -57,4 +87,4 @@ def generate_memory_id() -> str:
 
 
 def generate_chat_history_id() -> str:
-    return generate_id("CHT_")
+    return generate_ordered_id("CHT_")  # High write volume: time-ordered
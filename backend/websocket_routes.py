@@ -232,9 +232,9 @@ async def websocket_endpoint(
                     import threading
                     print(f"DTO DEBUG: Stream Consumer running in Thread: {threading.get_ident()}")
                     print(f"DTO DEBUG: Stream Consumer Emitter ID: {id(emitter)}")
+                    events = emitter.iter_batches(timeout=120)
                     try:
-                        while True:
-                            event = await asyncio.wait_for(emitter.get(), timeout=120)
+                        async for event in events:
                             if event.type == EventType.STATUS and event.content == "__DONE__":
                                 break
                             
@@ -285,7 +285,7 @@ async def websocket_endpoint(
                                 )
                                 
                                 # CRITICAL: Send to WebSocket so frontend shows UI immediately!
-                                await websocket.send_json(event.to_dict())
+                                await websocket.send_text(event.to_json())
 
                                 break # Graceful exit for HITL (only when waiting for new approval)
                             
@@ -338,12 +338,15 @@ async def websocket_endpoint(
                             ]
                             
                             if should_send_to_websocket:
-                                await websocket.send_json(event.to_dict())
+                                await websocket.send_text(event.to_json())
                             
                     except asyncio.TimeoutError:
                         print("Resume stream timeout")
                     except Exception as e:
                         print(f"Resume streaming error: {e}")
+                    finally:
+                        # Return events drained past the break point to the queue
+                        await events.aclose()
                 
                 # Ensure consumer starts by creating task explicitly
                 consumer_task = asyncio.create_task(stream_resumed_events())
@@ -478,9 +481,9 @@ async def websocket_endpoint(
                 
                 async def stream_resume_events():
                     """Stream events with full persistence (same as main stream_events)."""
+                    events = emitter.iter_batches(timeout=120)
                     try:
-                        while True:
-                            event = await asyncio.wait_for(emitter.get(), timeout=120)
+                        async for event in events:
                             if event.type == EventType.STATUS and event.content == "__DONE__":
                                 break
                             
@@ -551,7 +554,7 @@ async def websocket_endpoint(
                                     pending=True,
                                     plan_json=event.content
                                 )
-                                await websocket.send_json(event.to_dict())
+                                await websocket.send_text(event.to_json())
                                 break
                             
                             # Send to frontend (exclude MESSAGE and THOUGHT - they're for persistence only)
@@ -561,7 +564,7 @@ async def websocket_endpoint(
                             ]
                             
                             if should_send_to_websocket:
-                                await websocket.send_json(event.to_dict())
+                                await websocket.send_text(event.to_json())
                             
                     except asyncio.TimeoutError:
                         print("Resume stream timeout")
@@ -569,6 +572,9 @@ async def websocket_endpoint(
                         print("🛑 Resume stream cancelled")
                     except Exception as e:
                         print(f"Resume streaming error: {e}")
+                    finally:
+                        # Return events drained past the break point to the queue
+                        await events.aclose()
                 
                 consumer_task = asyncio.create_task(stream_resume_events())
                 await asyncio.sleep(0.1)
@@ -696,10 +702,9 @@ async def websocket_endpoint(
                         pass
             
             async def stream_events():
+                events = emitter.iter_batches(timeout=120)
                 try:
-                    while True:
-                        event = await asyncio.wait_for(emitter.get(), timeout=120)
-                        
+                    async for event in events:
                         # Check for done signal
                         if event.type == EventType.STATUS and event.content == "__DONE__":
                             break
@@ -753,7 +758,7 @@ async def websocket_endpoint(
 
                             # CRITICAL: Send to WebSocket so frontend shows UI immediately!
                             # We break the loop below, so the normal "should_send_to_websocket" logic is skipped.
-                            await websocket.send_json(event.to_dict())
+                            await websocket.send_text(event.to_json())
                             
                             # CRITICAL: Break the stream loop here!
                             break
@@ -807,10 +812,13 @@ async def websocket_endpoint(
                         ]
                         
                         if should_send_to_websocket:
-                            event_dict = event.to_dict()
                             if chat_history_id:
+                                event_dict = event.to_dict()
                                 event_dict["id"] = chat_history_id
-                            await websocket.send_json(event_dict)
+                                await websocket.send_json(event_dict)
+                            else:
+                                # Already encoded by the producer at emit time
+                                await websocket.send_text(event.to_json())
                 
                 except asyncio.TimeoutError:
                     await update_workflow_run(workflow_run_id, status="timeout")
@@ -820,6 +828,9 @@ async def websocket_endpoint(
                 except Exception as e:
                     print(f"Event streaming error: {e}")
                     await update_workflow_run(workflow_run_id, status="failed")
+                finally:
+                    # Return events drained past the break point to the queue
+                    await events.aclose()
             
             # Send workflow running status
             await websocket.send_json({